@@ -2,8 +2,11 @@
 
 import argparse
 import os
+import sys
 from Compiler import Compiler
 from Compiler import Minify
+from Runtime.Optimizer import optimize
+from Runtime import Native
 import Interpreter
 
 
@@ -13,6 +16,9 @@ def process_args():
     parser.add_argument("-o", metavar="output_file", nargs=1, help="Path to output Brainfuck file")
     parser.add_argument("-r", action="store_true", help="Run the Brainfuck file after compilation")
     parser.add_argument("-m", "--minify", dest="minify", action="store_true", help="Minifies the compiled code")
+    parser.add_argument("--emit-c", dest="emit_c", action="store_true", help="Also translate the compiled code to a standalone C file (next to the output file, with a .c extension)")
+    parser.add_argument("--intrinsic-hints", dest="intrinsic_hints", action="store_true", help="Mark the divmod, printint and array index loops with hints, so 'Interpreter.py --intrinsics' runs native versions of them (the code is still standard Brainfuck). Implies --intrinsics with -r")
+    Interpreter.add_interpreter_arguments(parser)  # used when running the compiled code (-r)
 
     args = parser.parse_args()
 
@@ -25,17 +31,18 @@ def process_args():
 
     run_file = args.r
     minify_file = args.minify
+    interpreter_options = Interpreter.get_interpreter_options(args)
 
-    return input_file, output_file, run_file, minify_file
+    return input_file, output_file, run_file, minify_file, interpreter_options, args.emit_c, args.intrinsic_hints
 
 
-def compile_file(input_file, output_file, run, minify_file):
+def compile_file(input_file, output_file, run, minify_file, interpreter_options=None, emit_c=False, intrinsic_hints=False):
     print("Compiling file '%s'..." % input_file)
 
     with open(input_file, "rb") as f:
         code = f.read().decode("utf8")
 
-    brainfuck_code = Compiler.compile(code)
+    brainfuck_code = Compiler.compile(code, intrinsic_hints)
     brainfuck_code += "\n"
 
     if minify_file:
@@ -46,12 +53,25 @@ def compile_file(input_file, output_file, run, minify_file):
 
     print("Compiled successfully to '%s'" % output_file)
 
+    if emit_c:
+        c_file = os.path.splitext(output_file)[0] + ".c"
+        with open(c_file, "wt") as f:
+            f.write(Native.generate_c_source(optimize(brainfuck_code)))
+        print("Translated to C successfully to '%s' (build it with 'cc -O2 %s')" % (c_file, c_file))
+
     if run:
         print("Running compiled code...")
-        Interpreter.brainfuck(brainfuck_code)
+        if intrinsic_hints:
+            interpreter_options = dict(interpreter_options or dict(), intrinsics=True)  # the hints were made for running them natively
+        Interpreter.run_from_command_line(brainfuck_code, **(interpreter_options or dict()))  # exits with 1 or 2 if the run failed or stopped
 
 
 if __name__ == '__main__':
-    input_file, output_file, run_file, minify_file = process_args()
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":  # BF-it.py batch <manifest> ...
+        import Batch
+        Batch.main(sys.argv[2:])
+        exit(0)
+
+    input_file, output_file, run_file, minify_file, interpreter_options, emit_c, intrinsic_hints = process_args()
     #input_file = "examples/games/tic_tac_toe.code"
-    compile_file(input_file, output_file, run_file, minify_file)
+    compile_file(input_file, output_file, run_file, minify_file, interpreter_options, emit_c, intrinsic_hints)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from Compiler import Compiler
+from Runtime.Optimizer import optimize
+from Runtime.Tape import BFRuntimeError
+from Runtime.Streams import CaptureOutput, EOF_POLICIES
+import Interpreter
+
+"""
+This file runs many (program, input) jobs on all the cores, e.g for regression tests and grading
+
+The manifest is a JSON lines file, with a job on every line:
+    {"program": "examples/calc.code", "input": "inputs/calc1.txt", "max_steps": 1000000, "timeout": 10}
+    program   - a .code file or a .bf file (compiled and optimized once, however many jobs use it)
+    input     - a file that holds the whole input (optional, the default is no input)
+    id        - a name for the job in the results (optional, the default is its line number)
+    max_steps, timeout, eof - per job limits (optional, the defaults are given on the command line)
+Paths are relative to the manifest's directory
+
+The results are JSON lines too, one for every job, in the order of the manifest:
+    {"id": ..., "program": ..., "input": ..., "stdout": ..., "exit": ..., "steps": ..., "elapsed": ...}
+    stdout  - the output, decoded as latin-1 (so every byte is one character, and .encode("latin-1") gives the bytes back)
+    exit    - halted, max_steps, timeout, or "error: <message>"
+"""
+
+ENGINES = ["ir", "jit"]  # the engines of Interpreter.py that run in the worker process itself
+
+programs = dict()  # path --> optimized instructions (or the error that prevented them), set in every worker
+
+
+def set_programs(compiled_programs):
+    global programs
+    programs = compiled_programs
+
+
+def load_program(path, intrinsics=False):
+    # returns the optimized instructions of a .code or a .bf file, or the error that prevented them
+    # with intrinsics, .code files are compiled with intrinsic hints, and the hinted fragments run natively
+    try:
+        with open(path, "rb") as f:
+            code = f.read().decode("utf8")
+        if not path.endswith(".bf"):
+            code = Compiler.compile(code, intrinsics)
+        return optimize(code, intrinsics=intrinsics)
+    except Exception as e:  # (any error of the compiler is this program's error, the other programs still run)
+        return e
+
+
+def run_job(job):
+    result = dict(id=job["id"], program=job["program"], input=job.get("input"), stdout="", steps=0)
+    program = programs[job["program"]]
+    start = time.monotonic()
+    if isinstance(program, Exception):
+        result.update(exit="error: %s" % (str(program) or type(program).__name__), elapsed=0.0)
+        return result
+
+    output = CaptureOutput()
+    try:
+        input_bytes = b""
+        if job.get("input") is not None:
+            with open(job["input"], "rb") as f:
+                input_bytes = f.read()
+        state = Interpreter.brainfuck(program, output=output, input_bytes=input_bytes, eof=job["eof"], engine=job["engine"],
+                                      max_steps=job["max_steps"], timeout=job["timeout"])
+        result.update(exit=state.status, steps=state.steps)
+    except (SyntaxError, BFRuntimeError, OSError, ValueError) as e:  # (ValueError - the job's options are invalid)
+        result.update(exit="error: %s" % str(e).strip())
+
+    result.update(stdout=output.getvalue().decode("latin-1"), elapsed=round(time.monotonic() - start, 6))
+    return result
+
+
+def get_job_error(job):
+    # returns what is wrong with the types (or values) of the job's fields, or None if they are fine
+    def is_number(value):
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+    if not isinstance(job, dict):
+        return "a job must be a JSON object"
+    if "program" not in job:
+        return "a job must have a 'program'"
+    if not isinstance(job["program"], str):
+        return "'program' must be a path (string)"
+    if job.get("input") is not None and not isinstance(job["input"], str):
+        return "'input' must be a path (string)"
+    if job.get("max_steps") is not None and not (isinstance(job["max_steps"], int) and not isinstance(job["max_steps"], bool)):
+        return "'max_steps' must be an integer"
+    if job.get("timeout") is not None and not is_number(job["timeout"]):
+        return "'timeout' must be a number"
+    if job.get("eof", "unchanged") not in EOF_POLICIES:
+        return "'eof' must be one of: %s" % ", ".join(EOF_POLICIES)
+    if job.get("engine", "ir") not in ENGINES:
+        return "'engine' must be one of: %s" % ", ".join(ENGINES)
+    return None
+
+
+def read_manifest(path, defaults):
+    # returns the list of jobs in the manifest (with the defaults filled in, and the paths made relative to the current directory)
+    directory = os.path.dirname(path)
+    jobs = []
+    with open(path, "rt") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if len(line) == 0 or line.startswith("#"):
+                continue
+            try:
+                job = json.loads(line)
+            except ValueError as e:
+                raise ValueError("%s line %s: %s" % (path, line_number, e))
+            error = get_job_error(job)
+            if error is not None:
+                raise ValueError("%s line %s: %s" % (path, line_number, error))
+
+            job["program"] = os.path.join(directory, job["program"])
+            if job.get("input") is not None:
+                job["input"] = os.path.join(directory, job["input"])
+            job.setdefault("id", line_number)
+            for name, value in defaults.items():
+                job.setdefault(name, value)
+            jobs.append(job)
+    return jobs
+
+
+def run_batch(jobs, workers=None, intrinsics=False):
+    """
+    compiles and optimizes every program once, and runs the jobs on a pool of <workers> processes (default: one for every core)
+    :param intrinsics: as in load_program()
+    :return: generator of the results, in the order of the jobs
+    """
+    compiled_programs = dict()
+    for job in jobs:
+        if job["program"] not in compiled_programs:
+            compiled_programs[job["program"]] = load_program(job["program"], intrinsics)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=set_programs, initargs=(compiled_programs,)) as executor:
+        for result in executor.map(run_job, jobs):
+            yield result
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(prog="BF-it.py batch", description="Run every job in a manifest (see Batch.py), and write the results as JSON lines")
+    parser.add_argument("manifest", help="Path to the manifest (JSON lines)")
+    parser.add_argument("-o", dest="output_file", metavar="FILE", default=None, help="Write the results to FILE instead of the standard output")
+    parser.add_argument("-j", "--workers", dest="workers", metavar="N", type=int, default=None, help="Amount of worker processes (default: the amount of cores)")
+    parser.add_argument("--max-steps", dest="max_steps", metavar="STEPS", type=int, default=None, help="Default step limit of a job (default: no limit)")
+    parser.add_argument("--timeout", dest="timeout", metavar="SECONDS", type=float, default=None, help="Default time limit of a job (default: no limit)")
+    parser.add_argument("--eof", dest="eof", choices=EOF_POLICIES, default="unchanged", help="Default EOF policy of a job (default: %(default)s)")
+    parser.add_argument("--engine", dest="engine", choices=ENGINES, default="ir", help="The engine the jobs run on (default: %(default)s)")
+    parser.add_argument("--intrinsics", dest="intrinsics", action="store_true", help="Compile the .code programs with intrinsic hints, and run the hinted fragments natively (in .bf programs too)")
+    args = parser.parse_args(arguments)
+
+    defaults = dict(max_steps=args.max_steps, timeout=args.timeout, eof=args.eof, engine=args.engine)
+    try:
+        jobs = read_manifest(args.manifest, defaults)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        exit(1)
+
+    output = open(args.output_file, "wt") if args.output_file is not None else sys.stdout
+    try:
+        for result in run_batch(jobs, args.workers, args.intrinsics):
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == '__main__':
+    main()
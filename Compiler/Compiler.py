@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
-from Compiler.Lexical_analyzer import analyze
+from Compiler.Lexical_analyzer import tokenize
 from Compiler.FunctionCompiler import FunctionCompiler
 from Compiler.Parser import Parser
+from Compiler.Token import TYPE_TOKENS
 from Compiler.General import *
 
 
@@ -10,18 +11,20 @@ This file is responsible for creating FunctionCompiler objects and global variab
 And finally return the code of the main function
 """
 
+GLOBAL_VARIABLE_DEFINITION_TOKENS = frozenset((Token.SEMICOLON, Token.ASSIGN, Token.LBRACK))  # the tokens after "int ID" in a global variable definition
+
 
 class Compiler:
 
     def __init__(self, code):
-        self.parser = Parser(analyze(code))
+        self.parser = Parser(tokenize(code))  # tokens are read as the parser reaches them
 
     # global variables and functions
     def create_function_object(self):
         # function: (INT | VOID) ID LPAREN expression_list RPAREN LBRACE statements RBRACE
         # returns function named tuple
 
-        if self.parser.current_token().type not in [Token.VOID, Token.INT]:
+        if self.parser.current_token().type not in TYPE_TOKENS:
             raise BFSemanticError("Function return type can be either void or int, and not '%s'" % str(self.parser.current_token()))
 
         self.parser.check_next_tokens_are([Token.ID, Token.LPAREN])
@@ -33,7 +36,7 @@ class Compiler:
         RBRACE_index = self.parser.find_matching(starting_index=RPAREN_index+1)  # then find RBRACE
 
         # take all tokens between INT and RBRACE and pass them to function object
-        function_tokens = self.parser.tokens[self.parser.current_token_index:RBRACE_index+1]
+        function_tokens = self.parser.get_tokens(self.parser.current_token_index, RBRACE_index+1)
         # skip function definition
         self.parser.current_token_index = RBRACE_index+1
 
@@ -77,26 +80,28 @@ class Compiler:
         """
         code = ''
         token = self.parser.current_token()
-        while token is not None and token.type in [Token.VOID, Token.INT]:
+        while token is not None and token.type in TYPE_TOKENS:
             self.parser.check_next_tokens_are([Token.ID])
 
             if self.parser.next_token(next_amount=2).type == Token.LPAREN:
                 function = self.create_function_object()
                 insert_function_object(function)
-            elif token.type is Token.INT and self.parser.next_token(next_amount=2).type in [Token.SEMICOLON, Token.ASSIGN, Token.LBRACK]:
+            elif token.type is Token.INT and self.parser.next_token(next_amount=2).type in GLOBAL_VARIABLE_DEFINITION_TOKENS:
                 code += self.compile_global_variable_definition()
             else:
                 raise BFSyntaxError("Unexpected '%s' after '%s'. Expected '(' (function definition) or one of: '=', ';', '[' (global variable definition)" % (str(self.parser.next_token(next_amount=2)), str(self.parser.next_token())))
 
+            self.parser.forget_previous_tokens()  # the definition was processed (a function keeps its own tokens)
             token = self.parser.current_token()
 
         if self.parser.current_token() is not None:  # we have not reached the last token
-            untouched_tokens = [str(t) for t in self.parser.tokens[self.parser.current_token_index:]]
+            untouched_tokens = [str(t) for t in self.parser.get_tokens(self.parser.current_token_index)]
             raise BFSyntaxError("Did not reach the end of the code. Untouched tokens:\n%s" % untouched_tokens)
 
         return code
 
     def compile(self):
+        clear_globals()
         insert_library_functions()
         code = self.process_global_definitions()  # code that initializes global variables and advances pointer to after them
 
@@ -106,11 +111,13 @@ class Compiler:
         return code
 
 
-def compile(code):
+def compile(code, intrinsic_hints=False):
     """
     :param code:  C-like code (string)
+    :param intrinsic_hints:  wrap the fragments that our interpreter has native versions of in hints (see Runtime/Intrinsics.py)
     :return code:  Brainfuck code (string)
     """
+    set_intrinsic_hints(intrinsic_hints)
     compiler = Compiler(code)
     brainfuck_code = compiler.compile()
     return brainfuck_code
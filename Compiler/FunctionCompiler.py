@@ -1,7 +1,9 @@
 from Compiler.Parser import Parser
 from Compiler.Node import *
+from Compiler.Statement import *
 from Compiler.General import *
 from Compiler.Globals import *
+from Compiler.Token import OPERAND_TOKENS, NOT_TOKENS, INCREMENT_TOKENS
 
 """
 This file implements the FunctionCompiler object
@@ -15,9 +17,21 @@ The idea is that we compile the function on demand - every time it is called
 And on every time we compile it - we pass it the current stack pointer
 This is implemented in the get_code() function
 
-FunctionCompiler object holds tokens correspond to the function so that we can compile it on demand
+FunctionCompiler object holds tokens correspond to the function
+On the first call, it parses them into a parse tree (see Statement.py and Node.py), and every call generates code from the parse tree
+The parse tree refers to the function's variable objects, and generating the code inserts them into the ids maps again,
+which sets their cells according to the current stack pointer
 """
 
+ID_STATEMENT_TOKENS = INCREMENT_TOKENS | {Token.ASSIGN, Token.LBRACK}  # the tokens after the ID of a statement that is an expression (e.g x = 5; or x++;)
+
+
+class IdsMap:
+    # a scope (see FunctionCompiler.ids_map_list)
+    def __init__(self, next_available_cell):
+        self.next_available_cell = next_available_cell
+        self.IDs_dict = dict()
+
 
 class LibraryFunctionCompiler:
     def __init__(self, name, type, parameters, code):
@@ -40,10 +54,11 @@ class FunctionCompiler:
         self.type = None
         self.parameters = None
         self.process_function_definition()  # sets type and parameters
+        self.function_scope = None  # the parse tree of the function's scope. will be set on the first call to this function
         self.return_value_cell = None  # will be set on every call to this function
 
     """
-    ids_map_list is a list of named tuples. each tuple represents a scope, and holds 2 items:
+    ids_map_list is a list of IdsMap objects. each one represents a scope, and holds 2 items:
         1. an index of the next available cell. (if we want to insert a new ID to the ids_map_list, it will be in that index)
         2. a dictionary that maps an ID (string) to an index - the cell where we hold that variable
 
@@ -83,6 +98,9 @@ class FunctionCompiler:
         create ids map for global variables
         make room for return_value
         """
+        if self.function_scope is None:  # (parsed on the first call, when all the functions and global variables are known)
+            self.function_scope = self.parse_function_scope()
+
         self.insert_global_variables_to_function_scope()
 
         # self.current_stack_pointer is now equal to the size of the global variables plus 1 (next_available_cell)
@@ -90,7 +108,7 @@ class FunctionCompiler:
         assert self.current_stack_pointer() <= current_stack_pointer
         self.return_value_cell = current_stack_pointer
         self.set_stack_pointer(current_stack_pointer+1) #  make room for return_value cell. next available cell is the next one after it.
-        function_code = self.compile_function_scope(self.parameters)
+        function_code = self.get_function_scope_code(self.function_scope)
         self.remove_ids_map()  # Global variables
         return function_code
 
@@ -183,11 +201,7 @@ class FunctionCompiler:
 
         next_available_cell = 0 if len(self.ids_map_list) == 0 else self.ids_map_list[0].next_available_cell
 
-        ids_map = namedtuple("ids_map", ["next_available_cell", "IDs_dict"])
-        ids_map.next_available_cell = next_available_cell
-        ids_map.IDs_dict = dict()
-
-        self.ids_map_list.insert(0, ids_map)
+        self.ids_map_list.insert(0, IdsMap(next_available_cell))
 
     def remove_ids_map(self):
         self.ids_map_list.pop(0)
@@ -241,21 +255,21 @@ class FunctionCompiler:
     def current_stack_pointer(self):
         return self.ids_map_list[0].next_available_cell
 
-    def insert_scope_variables_into_ids_map(self):
-        # go through all the variable definitions in this scope (not including sub-scopes), and add them to the ids map
-        # move the pointer to the next available cell (the one after the last variable declared in this scope)
+    def get_scope_variables(self):
+        # go through all the variable definitions in this scope (not including sub-scopes), and return their variables
+        # advances the parser to after the LBRACE
 
         assert self.parser.current_token().type == Token.LBRACE
         self.parser.advance_token()
 
+        variables = list()
         i = self.parser.current_token_index
         while i < len(self.tokens):
             token = self.tokens[i]
 
             if token.type == Token.INT:
                 if self.tokens[i-2].type != Token.FOR:  # if it is not a definition inside a FOR statement (for (int i = 0...))
-                    variable = create_variable_from_definition(self.parser, index=i)
-                    self.insert_to_ids_map(variable)
+                    variables.append(create_variable_from_definition(self.parser, index=i))
 
             elif token.type == Token.LBRACE:
                 i = self.parser.find_matching(starting_index=i)
@@ -265,12 +279,20 @@ class FunctionCompiler:
 
             i += 1
 
+        return variables
+
+    def insert_scope_variables_into_ids_map(self, variables):
+        # add the scope variables to the ids map
+        # move the pointer to the next available cell (the one after the last variable declared in this scope)
+        for variable in variables:
+            self.insert_to_ids_map(variable)
+
         return ">" * self.size_of_variables_current_scope()  # advance pointer to the next available cell
 
-    def enter_scope(self):
+    def enter_scope(self, variables):
         # create an ids map to the current scope, and then inserts the scope variables into it
         self.add_ids_map()
-        return self.insert_scope_variables_into_ids_map()
+        return self.insert_scope_variables_into_ids_map(variables)
 
     def exit_scope(self):
         # remove the ids map of the current scope
@@ -279,7 +301,7 @@ class FunctionCompiler:
         self.remove_ids_map()
         return code
 
-    def enter_function_scope(self, parameters):
+    def enter_function_scope(self, parameters, variables):
         # make room for return_value cell
         # create an ids map to the current function scope
         # insert parameters into the ids map
@@ -290,7 +312,7 @@ class FunctionCompiler:
             self.insert_to_ids_map(parameter)
 
         code = '>'  # skip return_value_cell
-        code += self.insert_scope_variables_into_ids_map()
+        code += self.insert_scope_variables_into_ids_map(variables)
         # this inserts scope variables AND moves pointer right, with the amount of BOTH parameters and scope variables
 
         return code
@@ -336,7 +358,7 @@ class FunctionCompiler:
             index_expression = self.get_array_index_expression()
             return NodeArrayGetElement(self.ids_map_list[:], token, index_expression)
 
-        if token.type in [Token.NUM, Token.CHAR, Token.ID, Token.TRUE, Token.FALSE]:
+        if token.type in OPERAND_TOKENS:
             self.parser.advance_token()
             return NodeToken(self.ids_map_list[:], token=token)
 
@@ -358,7 +380,7 @@ class FunctionCompiler:
         literal = self.literal()
         token = self.parser.current_token()
 
-        if token.type in [Token.INCREMENT, Token.DECREMENT, Token.UNARY_MULTIPLICATIVE]:
+        if token.type in INCREMENT_TOKENS:
             self.parser.advance_token()
             new_node = NodeUnaryPostfix(self.ids_map_list[:], operation=token, literal=literal)
             return new_node
@@ -370,14 +392,14 @@ class FunctionCompiler:
 
         token = self.parser.current_token()
 
-        if token.type in [Token.NOT, Token.BITWISE_NOT]:
+        if token.type in NOT_TOKENS:
             self.parser.advance_token()
             unary_prefix = self.unary_prefix()
 
             new_node = NodeUnaryPrefix(self.ids_map_list[:], operation=token, literal=unary_prefix)
             return new_node
 
-        elif token.type in [Token.INCREMENT, Token.DECREMENT, Token.UNARY_MULTIPLICATIVE]:
+        elif token.type in INCREMENT_TOKENS:
             self.parser.advance_token()
             literal = self.literal()
 
@@ -569,13 +591,14 @@ class FunctionCompiler:
         # expression: assignment
         return self.assignment()
 
-    def compile_expression(self):
+    def parse_expression(self):
         # parses mathematical expressions (+-*/ ())
         # increments/decrements (++, --)
         # relative operations (==, !=, <, >, <=, >=)
         # logical operations (!, &&, ||, ~)
         # assignment (=, +=, -=, *=, /=, %=, <<=, >>=, &=, |=, ^=)
         # this is implemented using a Node class that represents a parse tree
+        # returns the parse tree (its get_code() returns code that evaluates the expression)
 
         """
         (used reference: https://introcs.cs.princeton.edu/java/11precedence/)
@@ -609,9 +632,7 @@ class FunctionCompiler:
         literal: NUM | CHAR | ID | ID[expression] | TRUE | FALSE | function_call | ( expression )
         """
 
-        parse_tree = self.expression()
-        expression_code = parse_tree.get_code(self.current_stack_pointer())
-        return expression_code
+        return self.expression()
 
     # functions-related
     def get_function_parameters_declaration(self):
@@ -662,76 +683,93 @@ class FunctionCompiler:
         self.parser.advance_token()  # skip RPAREN
         return expressions
 
-    def compile_return(self):
+    def parse_return(self):
         # this assumes that the return is the last statement in the function
 
         self.parser.advance_token()  # skip return
         if self.parser.current_token().type == Token.SEMICOLON:
             # return;
             self.parser.advance_token()  # skip ;
-            return ''  # nothing to do
+            return None  # nothing to do
 
         # return exp;
-        expression_code = self.compile_expression()
+        expression = self.parse_expression()
         self.parser.check_current_tokens_are([Token.SEMICOLON])
 
         self.parser.advance_token()  # skip ;
+        return StatementReturn(expression)
 
-        code = expression_code  # after this, we point to next available cell
+    def get_return_code(self, statement):
+        code = statement.expression.get_code(self.current_stack_pointer())  # after this, we point to next available cell
         code += "<"  # point to value to return
         code += get_move_to_return_value_cell_code(self.return_value_cell, self.current_stack_pointer())
 
         return code
 
     # statements
-    def compile_expression_as_statement(self):
+    def parse_expression_as_statement(self):
         # this expression can be used as a statement.
         # e.g: x+=5;  or  x++ or ++x;
 
-        assert self.parser.current_token().type in [Token.ID, Token.INCREMENT, Token.DECREMENT, Token.UNARY_MULTIPLICATIVE]
+        assert self.parser.current_token().type == Token.ID or self.parser.current_token().type in INCREMENT_TOKENS
 
-        code = self.compile_expression()
+        expression = self.parse_expression()
         self.parser.check_current_tokens_are([Token.SEMICOLON])
         self.parser.advance_token()  # skip ;
 
+        return StatementExpression(expression)
+
+    def get_expression_statement_code(self, statement):
+        code = statement.expression.get_code(self.current_stack_pointer())  # at this point, we point to one after the expression's value
         code += "<"  # discard the expression's value
 
         return code
 
-    def compile_print_string(self):
+    def parse_print_string(self):
         self.parser.check_next_tokens_are([Token.LPAREN, Token.STRING, Token.RPAREN, Token.SEMICOLON])
         self.parser.advance_token(amount=2)  # skip print (
         string_to_print = self.parser.current_token().data
         self.parser.advance_token(amount=3)  # skip string ) ;
 
-        code = get_print_string_code(string_to_print)
-        return code
+        return StatementPrint(string_to_print)
 
-    def compile_function_call_statement(self):
-        # compile statement: function_call SEMICOLON
+    def parse_function_call_statement(self):
+        # parse statement: function_call SEMICOLON
+        # its code is the code of any expression statement (the function call's return value is discarded)
         function_call_node = self.function_call()
-        function_call_code = function_call_node.get_code(current_pointer=self.current_stack_pointer())
 
         self.parser.check_current_tokens_are([Token.SEMICOLON])
         self.parser.advance_token()  # skip ;
 
-        code = function_call_code  # at this point, we point to one after the return value
-        code += "<"  # discard return value
-        return code
+        return StatementExpression(function_call_node)
 
-    def compile_if(self):
+    def parse_if(self):
         self.parser.check_next_tokens_are([Token.LPAREN])
         self.parser.advance_token(amount=2)  # skip to after LPAREN
 
-        expression_code = self.compile_expression()
+        expression = self.parse_expression()
         self.parser.check_current_tokens_are([Token.RPAREN, Token.LBRACE])
         self.parser.advance_token()  # point to LBRACE
 
-        token_after_RBRACE = self.parser.token_at_index(self.parser.find_matching() + 1)
-        if token_after_RBRACE.type != Token.ELSE:
+        if_scope = self.parse_scope()
+        if self.parser.current_token().type != Token.ELSE:
             # if without else
+            return StatementIf(expression, if_scope)
 
-            inside_if_code = self.compile_scope()
+        # if ... else ...
+        self.parser.check_current_tokens_are([Token.ELSE, Token.LBRACE])
+        self.parser.advance_token()  # skip the 'else'
+        else_scope = self.parse_scope()
+
+        return StatementIf(expression, if_scope, else_scope)
+
+    def get_if_code(self, statement):
+        expression_code = statement.expression.get_code(self.current_stack_pointer())
+
+        if statement.else_scope is None:
+            # if without else
+
+            inside_if_code = self.get_scope_code(statement.if_scope)
 
             code = expression_code  # evaluate expression
             code += "<"  # point to the expression
@@ -747,11 +785,8 @@ class FunctionCompiler:
         # expression, execute_else
 
         self.increase_stack_pointer(amount=2)
-        inside_if_code = self.compile_scope()
-
-        self.parser.check_current_tokens_are([Token.ELSE, Token.LBRACE])
-        self.parser.advance_token()  # skip the 'else'
-        inside_else_code = self.compile_scope()
+        inside_if_code = self.get_scope_code(statement.if_scope)
+        inside_else_code = self.get_scope_code(statement.else_scope)
         self.decrease_stack_pointer(amount=2)
 
         code = expression_code  # evaluate expression. after this we point to "execute_else" cell
@@ -777,16 +812,20 @@ class FunctionCompiler:
 
         return code
 
-    def compile_while(self):
+    def parse_while(self):
         self.parser.check_next_tokens_are([Token.LPAREN])
         self.parser.advance_token(amount=2)  # skip to after LPAREN
 
-        expression_code = self.compile_expression()
+        expression = self.parse_expression()
 
         self.parser.check_current_tokens_are([Token.RPAREN, Token.LBRACE])
         self.parser.advance_token()  # i points to LBRACE
 
-        inner_scope_code = self.compile_scope()
+        return StatementWhile(expression, self.parse_scope())
+
+    def get_while_code(self, statement):
+        expression_code = statement.expression.get_code(self.current_stack_pointer())
+        inner_scope_code = self.get_scope_code(statement.scope)
 
         code = expression_code  # evaluate expression
         code += "<"  # point to the expression
@@ -798,14 +837,62 @@ class FunctionCompiler:
 
         return code
 
-    def compile_for(self):
+    def parse_for(self):
         # for (statement expression; expression) { inner_scope_code }
         # (the statement/second expression/inner_scope_code can be empty)
 
+        self.parser.check_current_tokens_are([Token.FOR, Token.LPAREN])
+        self.parser.advance_token(amount=2)  # skip for (
+
+        variable = None
+
+        # =============== enter FOR scope ===============
+        self.add_ids_map()
+        # ===============================================
+
+        if self.parser.current_token().type == Token.INT:
+            # we are defining a variable inside the for statement definition (for (int i = 0....))
+            variable = create_variable_from_definition(self.parser, advance_tokens=False)
+            self.insert_to_ids_map(variable)
+
+        initial_statement = self.parse_statement()
+
+        condition = self.parse_expression()
+        self.parser.check_current_tokens_are([Token.SEMICOLON])
+        self.parser.advance_token()  # skip ;
+
+        if self.parser.current_token().type == Token.RPAREN:
+            modification = None  # no modification expression
+        else:
+            modification = self.parse_expression()
+        self.parser.check_current_tokens_are([Token.RPAREN])
+        self.parser.advance_token()  # skip )
+
+        # parsing <for> scope inside { }:
+        self.parser.check_current_tokens_are([Token.LBRACE])
+        variables = self.get_scope_variables()
+
+        # the scope's variables are inserted into the <for> ids map, after the code of the expressions above is generated (see get_for_code)
+        # so the expressions above keep the ids map as it is now, and the scope is parsed with a copy of it that has the scope's variables too
+        for_ids_map = self.ids_map_list[0]
+        self.remove_ids_map()
+        self.add_ids_map()
+        self.ids_map_list[0].next_available_cell = for_ids_map.next_available_cell
+        self.ids_map_list[0].IDs_dict.update(for_ids_map.IDs_dict)
+
+        self.insert_scope_variables_into_ids_map(variables)
+        statements = self.parse_scope_statements()
+        # =============== exit FOR scope ===============
+        self.exit_scope()
+        # ===============================================
+
+        return StatementFor(variable, initial_statement, condition, modification, StatementScope(variables, statements))
+
+    def get_for_code(self, statement):
         """
             <for> is a special case of scope
             the initial code (int i = 0;) is executed INSIDE the scope, but BEFORE the LBRACE
-            so we manually compile the scope instead of using self.compile_scope():
+            so we manually compile the scope instead of using self.get_scope_code():
 
             we first create an ids map, and in the case that there is a variable definition inside the <for> definition:
             we manually insert the ID into the ids map, and move the pointer to the right once, to make room for it
@@ -816,43 +903,32 @@ class FunctionCompiler:
             finally, at the end of the <for> loop, we move the pointer once to the left, to discard the variable we defined manually
         """
 
-        self.parser.check_current_tokens_are([Token.FOR, Token.LPAREN])
-        self.parser.advance_token(amount=2)  # skip for (
-
-        manually_inserted_variable_in_for_definition = False
+        manually_inserted_variable_in_for_definition = statement.variable is not None
         code = ''
 
         # =============== enter FOR scope ===============
         self.add_ids_map()
         # ===============================================
 
-        if self.parser.current_token().type == Token.INT:
-            # we are defining a variable inside the for statement definition (for (int i = 0....))
-            variable = create_variable_from_definition(self.parser, advance_tokens=False)
-            self.insert_to_ids_map(variable)
-            manually_inserted_variable_in_for_definition = True
-            code += ">" * get_variable_size(variable)
+        if manually_inserted_variable_in_for_definition:
+            self.insert_to_ids_map(statement.variable)
+            code += ">" * get_variable_size(statement.variable)
 
-        initial_statement = self.compile_statement()
+        initial_statement = self.get_statement_code(statement.initial_statement) if statement.initial_statement is not None else ''
 
-        condition_expression = self.compile_expression()
-        self.parser.check_current_tokens_are([Token.SEMICOLON])
-        self.parser.advance_token()  # skip ;
+        condition_expression = statement.condition.get_code(self.current_stack_pointer())
 
-        if self.parser.current_token().type == Token.RPAREN:
+        if statement.modification is None:
             modification_expression = ""  # no modification expression
         else:
-            modification_expression = self.compile_expression()
+            modification_expression = statement.modification.get_code(self.current_stack_pointer())
             modification_expression += "<"  # discard expression value
-        self.parser.check_current_tokens_are([Token.RPAREN])
-        self.parser.advance_token()  # skip )
 
         # compiling <for> scope inside { }:
-        self.parser.check_current_tokens_are([Token.LBRACE])
-        inner_scope_code = self.insert_scope_variables_into_ids_map()
+        inner_scope_code = self.insert_scope_variables_into_ids_map(statement.scope.variables)
         if manually_inserted_variable_in_for_definition:
             inner_scope_code += "<"
-        inner_scope_code += self.compile_scope_statements()
+        inner_scope_code += self.get_scope_statements_code(statement.scope.statements)
         # =============== exit FOR scope ===============
         inner_scope_code += self.exit_scope()
         if manually_inserted_variable_in_for_definition:
@@ -874,9 +950,8 @@ class FunctionCompiler:
 
         return code
 
-    def compile_statement(self):
-        # returns code that performs the current statement
-        # at the end, the pointer points to the same location it pointed before the statement was executed
+    def parse_statement(self):
+        # returns the parse tree of the current statement (or None if it has no code, e.g a variable definition)
 
         token = self.parser.current_token()
 
@@ -887,7 +962,7 @@ class FunctionCompiler:
 
             if self.parser.next_token().type == Token.SEMICOLON:  # INT ID SEMICOLON
                 self.parser.advance_token(2)  # skip ID SEMICOLON
-                return ''  # no code is generated here. code was generated for defining this variable when we entered the scope
+                return None  # no code is generated here. code was generated for defining this variable when we entered the scope
 
             elif self.parser.next_token().type == Token.LBRACK:  # INT ID (LBRACK NUM RBRACK)+ SEMICOLON
                 self.parser.advance_token(1)  # skip ID
@@ -896,76 +971,134 @@ class FunctionCompiler:
                     self.parser.advance_token(3)  # skip LBRACK, NUM, RBRACK
                 self.parser.check_current_tokens_are([Token.SEMICOLON])
                 self.parser.advance_token(1)  # skip SEMICOLON
-                return ''  # no code is generated here. code was generated for defining this variable when we entered the scope
+                return None  # no code is generated here. code was generated for defining this variable when we entered the scope
 
             else:
-                return self.compile_expression_as_statement()
+                return self.parse_expression_as_statement()
 
-        elif token.type in [Token.INCREMENT, Token.DECREMENT, Token.UNARY_MULTIPLICATIVE]:  # ++ID;
-            return self.compile_expression_as_statement()
+        elif token.type in INCREMENT_TOKENS:  # ++ID;
+            return self.parse_expression_as_statement()
 
         elif token.type == Token.ID:
-            if self.parser.next_token().type in [Token.ASSIGN, Token.LBRACK, Token.INCREMENT, Token.DECREMENT, Token.UNARY_MULTIPLICATIVE]:
+            if self.parser.next_token().type in ID_STATEMENT_TOKENS:
                 # ID ASSIGN expression; or ID([expression])+ ASSIGN expression; or ID++;
-                return self.compile_expression_as_statement()
+                return self.parse_expression_as_statement()
             elif self.parser.next_token().type == Token.LPAREN:  # ID(...);  (function call)
-                return self.compile_function_call_statement()
+                return self.parse_function_call_statement()
             raise BFSyntaxError("Unexpected '%s' after '%s'. Expected '=|+=|-=|*=|/=|%%=|<<=|>>=|&=|(|=)|^=' (assignment), '++|--' (modification) or '(' (function call)" % (str(self.parser.next_token()), str(token)))
 
         elif token.type == Token.PRINT:  # print(string);
-            return self.compile_print_string()
+            return self.parse_print_string()
 
         elif token.type == Token.IF:  # if (expression) {inner_scope} (else {inner_scope})?
-            return self.compile_if()
+            return self.parse_if()
 
         elif token.type == Token.LBRACE:
-            return self.compile_scope()
+            return self.parse_scope()
 
         elif token.type == Token.WHILE:  # while (expression) {inner_scope}
-            return self.compile_while()
+            return self.parse_while()
 
         elif token.type == Token.RETURN:
-            return self.compile_return()
+            return self.parse_return()
 
         elif token.type == Token.FOR:
-            return self.compile_for()
+            return self.parse_for()
 
         elif token.type == Token.SEMICOLON:
             #  empty statement
             self.parser.advance_token()  # skip ;
-            return ""
+            return None
 
         raise NotImplementedError(token)
 
-    def compile_scope_statements(self):
+    def get_statement_code(self, statement):
+        # returns code that performs the statement
+        # at the end, the pointer points to the same location it pointed before the statement was executed
+
+        if isinstance(statement, StatementExpression):
+            return self.get_expression_statement_code(statement)
+
+        elif isinstance(statement, StatementPrint):
+            return get_print_string_code(statement.string)
+
+        elif isinstance(statement, StatementIf):
+            return self.get_if_code(statement)
+
+        elif isinstance(statement, StatementScope):
+            return self.get_scope_code(statement)
+
+        elif isinstance(statement, StatementWhile):
+            return self.get_while_code(statement)
+
+        elif isinstance(statement, StatementReturn):
+            return self.get_return_code(statement)
+
+        elif isinstance(statement, StatementFor):
+            return self.get_for_code(statement)
+
+        raise NotImplementedError(statement)
+
+    def parse_scope_statements(self):
         tokens = self.tokens
 
-        code = ''
+        statements = list()
         while self.parser.current_token() is not None:
 
             if self.parser.current_token().type == Token.RBRACE:
                 # we reached the end of our scope
                 self.parser.advance_token()  # skip RBRACE
-                return code
+                return statements
             else:
-                code += self.compile_statement()
+                statement = self.parse_statement()
+                if statement is not None:
+                    statements.append(statement)
 
         # should never get here
         raise BFSyntaxError("expected } after the last token in scope " + str(tokens[-1]))
 
-    def compile_scope(self):
+    def get_scope_statements_code(self, statements):
+        code = ''
+        for statement in statements:
+            code += self.get_statement_code(statement)
+        return code
+
+    def parse_scope(self):
         assert self.parser.current_token().type == Token.LBRACE
 
-        code = self.enter_scope()
-        code += self.compile_scope_statements()
+        variables = self.get_scope_variables()
+        self.enter_scope(variables)
+        statements = self.parse_scope_statements()
+        self.exit_scope()
+
+        return StatementScope(variables, statements)
+
+    def get_scope_code(self, scope):
+        code = self.enter_scope(scope.variables)
+        code += self.get_scope_statements_code(scope.statements)
         code += self.exit_scope()
 
         return code
 
-    def compile_function_scope(self, parameters):
+    def parse_function_scope(self):
+        #  returns the parse tree of the function's scope
+        #  the global variables and the parameters are inserted into the ids maps while parsing (as they are while generating the code)
+
+        assert self.parser.current_token().type == Token.LBRACE
+
+        self.insert_global_variables_to_function_scope()
+        variables = self.get_scope_variables()
+        self.enter_function_scope(self.parameters, variables)
+        statements = self.parse_scope_statements()
+        self.exit_scope()
+        self.remove_ids_map()  # Global variables
+
+        return StatementScope(variables, statements)
+
+    def get_function_scope_code(self, function_scope):
         #  returns code for the current function
-        #  parameters is a list of parameters, in the order of their declaration
-        #  will be inserted to the new scope prior to the scope's compilation
+        #  self.parameters is a list of parameters, in the order of their declaration
+        #  will be inserted to the new scope prior to the scope's variables
 
         """
             example layout:
@@ -993,12 +1126,9 @@ class FunctionCompiler:
                     therefore begin with '>' * (1 + parameters + scope variables)
         """
 
-        assert self.parser.current_token().type == Token.LBRACE
-
-        code = self.enter_function_scope(parameters)
-        code += self.compile_scope_statements()
+        code = self.enter_function_scope(self.parameters, function_scope.variables)
+        code += self.get_scope_statements_code(function_scope.statements)
         code += self.exit_scope()
         code += "<"  # point to return_value_cell
 
         return code
-
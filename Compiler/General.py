@@ -11,6 +11,14 @@ And general functions that are not dependent on other objects
 # =================
 
 
+def get_intrinsic_hint_code(name, code):
+    # when compiling with intrinsic hints, wraps the code in a hint: {<name>:<code>}
+    # Brainfuck ignores the hint's characters, and our interpreter runs a native version of the code instead (see Runtime/Intrinsics.py)
+    if not get_intrinsic_hints():
+        return code
+    return "{%s:%s}" % (name, code)
+
+
 def get_readint_code():
     # res, tmp, input, loop
     # tmp is used for multiplication
@@ -73,7 +81,7 @@ def get_printint_code():
     # ==============================================================================================
 
     code += "<"  # point to value_to_return cell
-    return code
+    return get_intrinsic_hint_code("printint", code)
 
 
 def get_readchar_code():
@@ -360,7 +368,7 @@ def get_divmod_code():
 
     """
 
-    return code
+    return get_intrinsic_hint_code("divmod", code)
 
 
 def get_bitwise_code(code_logic):
@@ -1034,8 +1042,8 @@ def get_move_right_index_cells_code(current_pointer, node_index):
     # 0  index next_available_cell (point to next available cell)
 
     # index, steps_taken_counter
-    code = node_index.get_code(current_pointer)  # index
-    code += "[-]"  # counter = 0
+    index_code = node_index.get_code(current_pointer)  # index
+    code = "[-]"  # counter = 0
     code += "<"  # point to index
 
     code += "["  # while index != 0
@@ -1053,7 +1061,7 @@ def get_move_right_index_cells_code(current_pointer, node_index):
     # old_index=0 new_index res (pointing to old index)
     code += ">>"  # point to res
 
-    return code
+    return index_code + get_intrinsic_hint_code("index_right", code)
 
 
 def get_move_left_index_cell_code():
@@ -1076,7 +1084,7 @@ def get_move_left_index_cell_code():
 
     # now res is at the desired cell, and we point to the next available cell
 
-    return code
+    return get_intrinsic_hint_code("index_left", code)
 
 
 # =================
@@ -1,6 +1,5 @@
 from collections import namedtuple
 from functools import reduce
-from copy import deepcopy
 from Compiler.Token import Token
 
 """
@@ -11,6 +10,7 @@ And related functions
 
 global_variables = list()  # Global list of global variables
 functions = dict()  # Global dictionary of function_name --> FunctionCompiler objects
+intrinsic_hints = False  # whether fragments that have a native version in our interpreter are wrapped in hints (see Runtime/Intrinsics.py)
 
 
 # General Error classes
@@ -24,6 +24,21 @@ class BFSemanticError(Exception):
     pass
 
 
+def clear_globals():
+    # forgets the functions and global variables of the previous program, so every compilation starts fresh
+    global_variables.clear()
+    functions.clear()
+
+
+def set_intrinsic_hints(enabled):
+    global intrinsic_hints
+    intrinsic_hints = enabled
+
+
+def get_intrinsic_hints():
+    return intrinsic_hints
+
+
 # functions
 def insert_function_object(function):
     functions[function.name] = function
@@ -31,17 +46,17 @@ def insert_function_object(function):
 
 def get_function_object(name):
     """
-    must return a copy of the function
-    because we might need to compile function recursively
-    and if we dont work on different copies then we will interfere with the current token pointer etc
+    returns the function itself (not a copy)
+    a function is parsed once, and only generating its code depends on the call (see FunctionCompiler.get_code)
+    and the code of one call is generated before the code of the next one starts
 
     for example:
         int increase(n) { return n+1;}
         int main() {int x = increase(increase(1));}
 
-    while compiling the first call, we start a compilation of the same function object in the second call
+    the code of the second call (the parameter) is generated while generating the code of the first call, but before its function's code
     """
-    return deepcopy(functions[name])
+    return functions[name]
 
 
 def insert_library_functions():
@@ -111,20 +126,20 @@ def create_variable_from_definition(parser, index=None, advance_tokens=False):
     if index is None:
         index = parser.current_token_index
 
-    assert parser.tokens[index].type == Token.INT
+    assert parser.token_at_index(index).type == Token.INT
 
     parser.check_next_tokens_are([Token.ID], starting_index=index)
-    ID = parser.tokens[index + 1].data
+    ID = parser.token_at_index(index + 1).data
     type = Token.INT
 
     if advance_tokens:
         parser.advance_token(amount=2)  # skip INT ID
 
-    if parser.tokens[index + 2].type == Token.LBRACK:  # array (support multi-dimensional arrays)
+    if parser.token_at_index(index + 2).type == Token.LBRACK:  # array (support multi-dimensional arrays)
         dimensions = []  # element[i] holds the size of dimension[i]
-        while parser.tokens[index + 2].type == Token.LBRACK:
+        while parser.token_at_index(index + 2).type == Token.LBRACK:
             parser.check_next_tokens_are([Token.LBRACK, Token.NUM, Token.RBRACK], starting_index=index + 1)
-            dimensions.append(get_NUM_token_value(parser.tokens[index + 3]))
+            dimensions.append(get_NUM_token_value(parser.token_at_index(index + 3)))
 
             if advance_tokens:
                 parser.advance_token(amount=3)  # skip LBRACK NUM RBRACK
@@ -6,112 +6,119 @@ class LexicalErrorException(Exception):
     pass
 
 
+"""
+This file turns C-like code into tokens - a list of them (analyze), or a generator that reads them lazily (tokenize)
+
+All the token rules are compiled once, into a single regular expression of named groups
+Its alternatives are ordered so that the first one that matches is the longest match
+(and when two rules match the same text, the one that comes first wins):
+    keywords are matched as identifiers, and then looked up in KEYWORDS ("int" is INT, "international" is an ID)
+    operators are matched longest first, and then looked up in OPERATORS ("<<=" is ASSIGN, not "<<" and "=")
+    a "//" comment must be longer than "//", which would be UNARY_MULTIPLICATIVE (this happens only at the end of the text)
+"""
+
+KEYWORDS = {
+    'void': Token.VOID,
+    'int': Token.INT,
+    'bool': Token.INT,  # treat bool as int
+    'char': Token.INT,  # treat char as int
+
+    'true': Token.TRUE,
+    'false': Token.FALSE,
+    'return': Token.RETURN,
+    'if': Token.IF,
+    'else': Token.ELSE,
+    'while': Token.WHILE,
+    'for': Token.FOR,
+    'print': Token.PRINT,
+    'break': Token.BREAK,  # todo
+    'continue': Token.CONTINUE,  # todo
+}
+
+OPERATORS = {
+    '&&': Token.AND,
+    '||': Token.OR,
+    '!': Token.NOT,
+    ';': Token.SEMICOLON,
+    ',': Token.COMMA,
+
+    '(': Token.LPAREN,
+    ')': Token.RPAREN,
+    '{': Token.LBRACE,
+    '}': Token.RBRACE,
+    '[': Token.LBRACK,
+    ']': Token.RBRACK,
+    '=': Token.ASSIGN, '+=': Token.ASSIGN, '-=': Token.ASSIGN, '*=': Token.ASSIGN, '/=': Token.ASSIGN, '%=': Token.ASSIGN,
+    '<<=': Token.ASSIGN, '>>=': Token.ASSIGN, '&=': Token.ASSIGN, '|=': Token.ASSIGN, '^=': Token.ASSIGN,
+
+    '<=': Token.RELOP, '>=': Token.RELOP, '==': Token.RELOP, '!=': Token.RELOP, '<': Token.RELOP, '>': Token.RELOP,
+    '++': Token.INCREMENT,
+    '--': Token.DECREMENT,
+    '+': Token.BINOP, '-': Token.BINOP, '*': Token.BINOP, '/': Token.BINOP, '%': Token.BINOP,
+    '**': Token.UNARY_MULTIPLICATIVE, '//': Token.UNARY_MULTIPLICATIVE, '%%': Token.UNARY_MULTIPLICATIVE,
+
+    '<<': Token.BITWISE_SHIFT, '>>': Token.BITWISE_SHIFT,
+    '~': Token.BITWISE_NOT,
+    '&': Token.BITWISE_AND,
+    '|': Token.BITWISE_OR,
+    '^': Token.BITWISE_XOR,
+}
+
+RULES = [
+    ('WHITESPACE', r'\s+'),
+    ('COMMENT', r'//(?=[\s\S]).*(?:\n|$)|/\*[\s\S]*?\*/'),  # (before the operators, which start with '/' too)
+    ('ID', r'[a-zA-Z_][a-zA-Z0-9_]*'),
+    ('NUM', r'0x[A-Fa-f\d]+|\d+'),  # hexadecimal or decimal number
+    ('STRING', r'"[^"]*"'),
+    ('CHAR', r"'(?:\\)?[^']'"),
+    ('OPERATOR', '|'.join(re.escape(operator) for operator in sorted(OPERATORS, key=len, reverse=True))),
+    ('UNIDENTIFIED', r'.'),
+]
+TOKEN_PATTERN = re.compile('|'.join('(?P<%s>%s)' % rule for rule in RULES))
+
+TOKENS_WITH_DATA = frozenset((Token.NUM, Token.ID, Token.BINOP, Token.RELOP, Token.ASSIGN, Token.UNARY_MULTIPLICATIVE, Token.BITWISE_SHIFT))
+
+
+def tokenize(text):
+    """
+    :returns generator of the tokens in the text, which tokenizes the text only as far as the tokens are read
+    raises exception in case of lexical error (when the token that has it is reached)
+    """
+    line, line_start = 1, 0  # the line we are at, and the offset of its beginning from the beginning of the text
+
+    for match in TOKEN_PATTERN.finditer(text):
+        kind, start = match.lastgroup, match.start()
+        column = start - line_start + 1  # humans count from 1 :)
+
+        if kind == 'ID':
+            matched_token = KEYWORDS.get(match.group(), Token.ID)
+        elif kind == 'OPERATOR':
+            matched_token = OPERATORS[match.group()]
+        else:
+            matched_token = getattr(Token, kind)
+
+        if matched_token == Token.UNIDENTIFIED:
+            raise LexicalErrorException("Unidentified Character '%s' (line %s column %s)" % (match.group(), line, column))
+        elif matched_token == Token.STRING or matched_token == Token.CHAR:
+            # remove quotes at beginning and end, un-escape characters
+            yield Token(matched_token, line, column, match.group()[1:-1].encode("utf8").decode("unicode_escape"))
+        elif matched_token in TOKENS_WITH_DATA:
+            yield Token(matched_token, line, column, match.group())
+        elif matched_token != Token.WHITESPACE and matched_token != Token.COMMENT:
+            yield Token(matched_token, line, column)
+
+        newlines = text.count('\n', start, match.end())
+        if newlines > 0:  # (only whitespace, comments and strings span lines)
+            line += newlines
+            line_start = text.rfind('\n', start, match.end()) + 1
+
+
 def analyze(text):
     """
     :returns list of tokens in the text
     raises exception in case of lexical error
     """
-
-    rules = [
-        ('\s+', Token.WHITESPACE),
-        ('void',    Token.VOID),
-        ('int',     Token.INT),
-        ('bool', Token.INT),  # treat bool as int
-        ('char', Token.INT),  # treat char as int
-
-        ('true', Token.TRUE),
-        ('false', Token.FALSE),
-        ('&&', Token.AND),
-        ('\|\|', Token.OR),
-        ('\!', Token.NOT),
-        ('return', Token.RETURN),
-        ('if', Token.IF),
-        ('else', Token.ELSE),
-        ('while', Token.WHILE),
-        ('for', Token.FOR),
-        ('print', Token.PRINT),
-        ('break', Token.BREAK),  # todo
-        ('continue', Token.CONTINUE),  # todo
-        (';', Token.SEMICOLON),
-        (',', Token.COMMA),
-
-        ('\(', Token.LPAREN),
-        ('\)', Token.RPAREN),
-        ('\{', Token.LBRACE),
-        ('\}', Token.RBRACE),
-        ('\[', Token.LBRACK),
-        ('\]', Token.RBRACK),
-        ('=|\+=|-=|\*=|/=|%=|<<=|>>=|&=|\|=|\^=', Token.ASSIGN),
-
-        ('<=|>=|==|!=|<|>', Token.RELOP),
-        ('\+\+', Token.INCREMENT),
-        ('--', Token.DECREMENT),
-        ('\+|-|\*|/|%', Token.BINOP),
-        ('\*\*|//|%%', Token.UNARY_MULTIPLICATIVE),
-
-        ('<<|>>', Token.BITWISE_SHIFT),
-        ('~', Token.BITWISE_NOT),
-        ('&', Token.BITWISE_AND),
-        ('\|', Token.BITWISE_OR),
-        ('\^', Token.BITWISE_XOR),
-
-        ('([a-zA-Z_][a-zA-Z0-9_]*)',    Token.ID),
-        ('(\d+)',     Token.NUM),
-        ('(0x[A-Fa-f\d]+)',     Token.NUM),  # hexadecimal number
-        ('\"([^\"])*\"',   Token.STRING),
-        ('\'(\\\\)?[^\']\'', Token.CHAR),
-        ('//.*(\\n|$)', Token.COMMENT),
-        (r'/\*[\s\S]*?\*/', Token.COMMENT),  # multiline comments
-        ('.',       Token.UNIDENTIFIED)
-    ]
-
-    rules = [(re.compile(r), t) for r, t in rules]
-
-    tokens = []
-
-    # create a mapping of [line number] to [offset of that line from the beginning of the text]
-    newline = re.compile('\n')
-    lines = [0] + [m.end() for m in re.finditer(newline, text)]
-
-    i = 0
-    while i < len(text):
-
-        current_matches = []
-        for regex, token_type in rules:
-            m = regex.match(text, i)
-            if m:
-                current_matches.append((m, token_type))
-
-        # pick the token that fits the longest match
-        # if tie - pick the one defined first in the rules list
-        longest_match, max_i, matched_token = None, i, None
-        for match, token_type in current_matches:
-            if match.end() > max_i:
-                longest_match, max_i, matched_token = match, match.end(), token_type
-
-        # calculate line and column
-        line, column = None, None
-        for line_idx in range(len(lines)-1):
-            if lines[line_idx] <= longest_match.start() < lines[line_idx+1]:
-                line, column = line_idx+1, (longest_match.start() - lines[line_idx])+1  # humans count from 1 :)
-                break
-        if not line:
-            line, column = len(lines), (longest_match.start() - lines[-1])+1
-
-        if matched_token != Token.COMMENT:
-            if matched_token == Token.UNIDENTIFIED:
-                raise LexicalErrorException("Unidentified Character '%s' (line %s column %s)" % (text[i], line, column))
-            if matched_token != Token.WHITESPACE:
-                if matched_token in [Token.STRING, Token.CHAR]:
-                    # remove quotes at beginning and end, un-escape characters
-                    tokens.append(Token(matched_token, line, column, longest_match.group()[1:-1].encode("utf8").decode("unicode_escape")))
-                elif matched_token in [Token.NUM, Token.ID, Token.BINOP, Token.RELOP, Token.ASSIGN, Token.UNARY_MULTIPLICATIVE, Token.BITWISE_SHIFT]:
-                    tokens.append(Token(matched_token, line, column, longest_match.group()))
-                else:
-                    tokens.append(Token(matched_token, line, column))
-        i = longest_match.end()
-
-    return tokens
+    return list(tokenize(text))
 
 
 
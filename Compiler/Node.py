@@ -1,4 +1,5 @@
 from Compiler.General import *
+from Compiler.Token import OPERAND_TOKENS, BINARY_OPERATOR_TOKENS, UNARY_OPERATOR_TOKENS, NOT_TOKENS, INCREMENT_TOKENS
 
 """
 This file holds classes that are used to create the parse tree of expressions
@@ -44,12 +45,12 @@ class NodeToken(Node):
     def get_code(self, current_pointer, *args, **kwargs):
         # returns the code that evaluates the parse tree
 
-        if self.token.type in [Token.NUM, Token.CHAR, Token.ID, Token.TRUE, Token.FALSE]:
+        if self.token.type in OPERAND_TOKENS:
             # its a literal (leaf)
             assert self.left is None and self.right is None
             return get_token_code(self.ids_map_list, self.token, current_pointer)
 
-        elif self.token.type in [Token.BINOP, Token.RELOP, Token.AND, Token.OR, Token.BITWISE_SHIFT, Token.BITWISE_AND, Token.BITWISE_OR, Token.BITWISE_XOR]:
+        elif self.token.type in BINARY_OPERATOR_TOKENS:
             code = self.left.get_code(current_pointer)
             code += self.right.get_code(current_pointer + 1)
             code += "<<"  # point to the first operand
@@ -95,9 +96,9 @@ class NodeUnaryPrefix(Node):
 
     def get_code(self, current_pointer, *args, **kwargs):
         # unary prefix (!x or ++x or ~x)
-        assert self.token_operation.type in [Token.NOT, Token.INCREMENT, Token.DECREMENT, Token.UNARY_MULTIPLICATIVE, Token.BITWISE_NOT]
+        assert self.token_operation.type in UNARY_OPERATOR_TOKENS
 
-        if self.token_operation.type in [Token.NOT, Token.BITWISE_NOT]:
+        if self.token_operation.type in NOT_TOKENS:
             code = self.node_literal.get_code(current_pointer)
             code += "<"  # point to operand
             code += get_unary_prefix_op_code(self.token_operation)
@@ -142,7 +143,7 @@ class NodeUnaryPostfix(Node):
     def get_code(self, current_pointer, *args, **kwargs):
 
         # its an unary postfix operation (x++)
-        assert self.token_operation.type in [Token.INCREMENT, Token.DECREMENT, Token.UNARY_MULTIPLICATIVE]
+        assert self.token_operation.type in INCREMENT_TOKENS
 
         if isinstance(self.node_literal, NodeArrayGetElement):
             token_id, index_node = self.node_literal.token_id, self.node_literal.node_expression
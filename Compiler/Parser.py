@@ -1,18 +1,90 @@
 from Compiler.Token import Token
 from Compiler.Globals import BFSyntaxError, BFSemanticError
 
+BRACKETS = {Token.LPAREN: Token.RPAREN, Token.LBRACK: Token.RBRACK, Token.LBRACE: Token.RBRACE}  # opening --> closing
+CLOSING_BRACKETS = frozenset(BRACKETS.values())
+
 
 class Parser:
     """
     Used to easily iterate tokens
+    The tokens can be a list, or any iterable of tokens (e.g the generator Lexical_analyzer.tokenize())
+    which is read only as far as the parser looks ahead, so a lexical error is found only when the parser reaches it
+
+    Token indexes count from the first token of the iterable
+    forget_previous_tokens() releases the tokens we are done with, so the buffer only holds the tokens we look ahead at
+
+    The brackets are matched as the tokens are buffered (with a stack of the brackets that are still open),
+    so find_matching() is a lookup, and unbalanced brackets are reported where they are:
+    the tokens of a list are all matched here, and the tokens of an iterable are matched as they are read
     """
     def __init__(self, tokens):
-        self.tokens = tokens
+        self.token_source = iter(tokens)
+        self.tokens = []  # the buffered tokens
+        self.matching_indexes = []  # the index of the bracket that matches every buffered token (None if it is not a matched bracket)
+        self.open_brackets = []  # the indexes of the brackets that were not closed yet
+        self.first_token_index = 0  # the index of self.tokens[0] (the tokens before it were released)
         self.current_token_index = 0
 
+        if isinstance(tokens, list):  # all the tokens are already here
+            while self.read_token():
+                pass
+
+    # buffering tokens
+    def read_token(self):
+        # reads the next token from the source into the buffer. returns False if there are no more tokens
+        token = next(self.token_source, None)
+        if token is None:
+            if len(self.open_brackets) > 0:
+                token_to_match = self.token_at_index(self.open_brackets[-1])
+                raise BFSyntaxError("did not find matching %s for %s" % (BRACKETS[token_to_match.type], str(token_to_match)))
+            return False
+
+        index = self.first_token_index + len(self.tokens)
+        self.tokens.append(token)
+        self.matching_indexes.append(None)
+        if token.type in BRACKETS:
+            self.open_brackets.append(index)
+        elif token.type in CLOSING_BRACKETS:
+            if len(self.open_brackets) == 0:
+                raise BFSyntaxError("Unexpected %s (there is no bracket for it to close)" % str(token))
+            open_index = self.open_brackets.pop()
+            open_token = self.token_at_index(open_index)
+            if BRACKETS[open_token.type] != token.type:
+                raise BFSyntaxError("Unexpected %s (expected %s, which matches %s)" % (str(token), BRACKETS[open_token.type], str(open_token)))
+            self.matching_indexes[open_index - self.first_token_index] = index
+            self.matching_indexes[index - self.first_token_index] = open_index
+        return True
+
+    def has_token(self, index):
+        # returns whether there is a token at index, reading tokens from the source until it (if it was not read yet)
+        while index - self.first_token_index >= len(self.tokens):
+            if not self.read_token():
+                return False
+        return True
+
+    def get_tokens(self, start, end=None):
+        # returns the list of tokens from index start up to (not including) end, or up to the last token if end is None
+        if end is None:
+            while self.has_token(self.first_token_index + len(self.tokens)):
+                pass
+        else:
+            self.has_token(end - 1)
+        return self.tokens[start - self.first_token_index:(end - self.first_token_index) if end is not None else None]
+
+    def forget_previous_tokens(self):
+        # releases the tokens before the previous token (which is kept for error messages, see check_current_tokens_are)
+        # and before the brackets that are still open
+        first_token_index = max(self.current_token_index - 1, self.first_token_index)
+        if len(self.open_brackets) > 0:
+            first_token_index = min(first_token_index, self.open_brackets[0])
+        del self.tokens[:first_token_index - self.first_token_index]
+        del self.matching_indexes[:first_token_index - self.first_token_index]
+        self.first_token_index = first_token_index
+
     # parsing tokens
     def current_token(self):
-        if self.current_token_index >= len(self.tokens):
+        if not self.has_token(self.current_token_index):
             return None
         else:
             return self.token_at_index(self.current_token_index)
@@ -21,8 +93,13 @@ class Parser:
         self.current_token_index += amount
 
     def token_at_index(self, index):
-        assert index < len(self.tokens)
-        return self.tokens[index]
+        if not self.has_token(index):  # (reads the tokens until index)
+            if len(self.tokens) == 0:
+                raise BFSyntaxError("Unexpected end of the code")
+            raise BFSyntaxError("Unexpected end of the code after %s" % str(self.tokens[-1]))
+        if index < self.first_token_index:
+            raise IndexError("Token %d was already released (the buffer starts at token %d)" % (index, self.first_token_index))
+        return self.tokens[index - self.first_token_index]
 
     def next_token(self, next_amount=1):
         return self.token_at_index(self.current_token_index + next_amount)
@@ -38,45 +115,25 @@ class Parser:
         if starting_index is None:
             starting_index = self.current_token_index
 
-        tokens = self.tokens
-        token_to_match = tokens[starting_index]
-        if token_to_match.type == Token.LBRACE:
-            inc = Token.LBRACE
-            dec = Token.RBRACE
-        elif token_to_match.type == Token.LBRACK:
-            inc = Token.LBRACK
-            dec = Token.RBRACK
-        elif token_to_match.type == Token.LPAREN:
-            inc = Token.LPAREN
-            dec = Token.RPAREN
-        else:
+        token_to_match = self.token_at_index(starting_index)
+        if token_to_match.type not in BRACKETS:
             raise BFSemanticError("no support for matching %s" % str(token_to_match))
 
-        i = starting_index
-        cnt = 0
-        while i < len(tokens):
-            if tokens[i].type == inc:
-                cnt += 1
-            elif tokens[i].type == dec:
-                cnt -= 1
-
-            if cnt == 0:
-                return i
-
-            i += 1
-
-        raise BFSyntaxError("did not find matching %s for %s" % (dec, str(token_to_match)))
+        # the matching bracket is read by now, or reading the tokens until it raises an error (if it is never closed)
+        while self.matching_indexes[starting_index - self.first_token_index] is None:
+            self.read_token()
+        return self.matching_indexes[starting_index - self.first_token_index]
 
     def check_next_tokens_are(self, tokens_list, starting_index=None):
         if starting_index is None:
             starting_index = self.current_token_index
 
         # used for "assertion" and print a nice message to the user
-        if starting_index + len(tokens_list) >= len(self.tokens):
-            raise BFSyntaxError("Expected %s after %s" % (str(tokens_list), str(self.tokens[starting_index])))
+        if not self.has_token(starting_index + len(tokens_list)):
+            raise BFSyntaxError("Expected %s after %s" % (str([str(t) for t in tokens_list]), str(self.token_at_index(starting_index))))
         for i in range(0, len(tokens_list)):
-            if self.tokens[starting_index + 1 + i].type != tokens_list[i]:
-                raise BFSyntaxError("Expected %s after %s" % (str(tokens_list[i]), [str(t) for t in self.tokens[starting_index: starting_index+1+i]]))
+            if self.token_at_index(starting_index + 1 + i).type != tokens_list[i]:
+                raise BFSyntaxError("Expected %s after %s" % (str(tokens_list[i]), [str(t) for t in self.get_tokens(starting_index, starting_index+1+i)]))
 
     def check_current_tokens_are(self, tokens_list):
         self.check_next_tokens_are(tokens_list, starting_index=self.current_token_index - 1)
@@ -0,0 +1,55 @@
+"""
+This file holds classes that are used to create the parse tree of statements (the parse tree of expressions is made of Node.py's classes)
+A function is parsed once into a StatementScope, and FunctionCompiler generates the function's code from it on every call
+The classes only hold the parsed statement - the code is generated by FunctionCompiler, which knows the stack pointer and the scopes
+"""
+
+
+class StatementScope:
+    # { statements }
+    def __init__(self, variables, statements):
+        self.variables = variables  # the variables defined in this scope (not including sub-scopes), in the order of their definitions
+        self.statements = statements
+
+
+class StatementExpression:
+    # an expression whose value is discarded. e.g: x = 5;  or  x++;  or  foo(x);
+    def __init__(self, expression):
+        self.expression = expression
+
+
+class StatementPrint:
+    # print("string");
+    def __init__(self, string):
+        self.string = string
+
+
+class StatementIf:
+    # if (expression) { if_scope } (else { else_scope })?
+    def __init__(self, expression, if_scope, else_scope=None):
+        self.expression = expression
+        self.if_scope = if_scope
+        self.else_scope = else_scope
+
+
+class StatementWhile:
+    # while (expression) { scope }
+    def __init__(self, expression, scope):
+        self.expression = expression
+        self.scope = scope
+
+
+class StatementFor:
+    # for (initial_statement condition; modification) { scope }
+    def __init__(self, variable, initial_statement, condition, modification, scope):
+        self.variable = variable  # the variable defined in the initial statement (for (int i = 0; ...)), or None
+        self.initial_statement = initial_statement  # None if it is empty (or only defines the variable)
+        self.condition = condition
+        self.modification = modification  # None if it is empty
+        self.scope = scope
+
+
+class StatementReturn:
+    # return expression;
+    def __init__(self, expression):
+        self.expression = expression
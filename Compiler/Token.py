@@ -1,51 +1,66 @@
-class Token(object):
+from enum import IntEnum
+
+"""
+Token kinds are small integers (TokenType), and the kinds are also attributes of Token (Token.INT is TokenType.INT)
+so comparing kinds is comparing integers, and a set of kinds is a frozenset that is built once (see the sets below)
+"""
+
+
+class TokenType(IntEnum):
+
+    INT = 0
+    VOID = 1
+    TRUE = 2
+    FALSE = 3
+    AND = 4
+    OR = 5
+    NOT = 6
+    RETURN = 7
+    IF = 8
+    ELSE = 9
+    WHILE = 10
+    FOR = 11
+    BREAK = 12
+    CONTINUE = 13
+    SEMICOLON = 14
+    COMMA = 15
+
+    LPAREN = 16
+    RPAREN = 17
+    LBRACE = 18
+    RBRACE = 19
+    LBRACK = 20
+    RBRACK = 21
+
+    ASSIGN = 22
+    RELOP = 23
+    BINOP = 24
+    INCREMENT = 25
+    DECREMENT = 26
+    UNARY_MULTIPLICATIVE = 27
+
+    BITWISE_SHIFT = 28
+    BITWISE_NOT = 29
+    BITWISE_AND = 30
+    BITWISE_OR = 31
+    BITWISE_XOR = 32
+
+    WHITESPACE = 33
+    ID = 34
+    NUM = 35
+    STRING = 36
+    CHAR = 37
 
-    INT = "INT"
-    VOID = "VOID"
-    TRUE = "TRUE"
-    FALSE = "FALSE"
-    AND = "AND"
-    OR = "OR"
-    NOT = "NOT"
-    RETURN = "RETURN"
-    IF = "IF"
-    ELSE = "ELSE"
-    WHILE = "WHILE"
-    FOR = "FOR"
-    BREAK = "BREAK"
-    CONTINUE = "CONTINUE"
-    SEMICOLON = "SEMICOLON"
-    COMMA = "COMMA"
-
-    LPAREN = "LPAREN"
-    RPAREN = "RPAREN"
-    LBRACE = "LBRACE"
-    RBRACE = "RBRACE"
-    LBRACK = "LBRACK"
-    RBRACK = "RBRACK"
-
-    ASSIGN = "ASSIGN"
-    RELOP = "RELOP"
-    BINOP = "BINOP"
-    INCREMENT = "INCREMENT"
-    DECREMENT = "DECREMENT"
-    UNARY_MULTIPLICATIVE = "UNARY_MULTIPLICATIVE"
-
-    BITWISE_SHIFT = "BITWISE_SHIFT"
-    BITWISE_NOT = "BITWISE_NOT"
-    BITWISE_AND = "BITWISE_AND"
-    BITWISE_OR = "BITWISE_OR"
-    BITWISE_XOR = "BITWISE_XOR"
-
-    WHITESPACE = "WHITESPACE"
-    ID = "ID"
-    NUM = "NUM"
-    STRING = "STRING"
-    CHAR = "CHAR"
-
-    PRINT = "PRINT"
-    COMMENT = "COMMENT"
-    UNIDENTIFIED = "UNIDENTIFIED"
+    PRINT = 38
+    COMMENT = 39
+    UNIDENTIFIED = 40
+
+    def __str__(self):
+        return self.name
+
+
+class Token(object):
+    __slots__ = ("type", "line", "column", "data")  # there is a token object for every token of the program
 
     def __init__(self, type, line, column, data=None):
         self.type = type
@@ -54,5 +69,17 @@ class Token(object):
         self.data = data
 
     def __str__(self):
-        return self.type + ((" " + self.data) if self.data is not None else "") + \
+        return self.type.name + ((" " + self.data) if self.data is not None else "") + \
                " (line %s column %s)" % (self.line, self.column)
+
+
+for token_type in TokenType:
+    setattr(Token, token_type.name, token_type)
+
+
+TYPE_TOKENS = frozenset((Token.VOID, Token.INT))  # a function's return type, or a variable's type
+OPERAND_TOKENS = frozenset((Token.NUM, Token.CHAR, Token.ID, Token.TRUE, Token.FALSE))  # the leaves of an expression
+BINARY_OPERATOR_TOKENS = frozenset((Token.BINOP, Token.RELOP, Token.AND, Token.OR, Token.BITWISE_SHIFT, Token.BITWISE_AND, Token.BITWISE_OR, Token.BITWISE_XOR))
+UNARY_OPERATOR_TOKENS = frozenset((Token.NOT, Token.INCREMENT, Token.DECREMENT, Token.UNARY_MULTIPLICATIVE, Token.BITWISE_NOT))
+NOT_TOKENS = frozenset((Token.NOT, Token.BITWISE_NOT))
+INCREMENT_TOKENS = frozenset((Token.INCREMENT, Token.DECREMENT, Token.UNARY_MULTIPLICATIVE))  # ++, -- and ** (which can come before or after an ID)
@@ -1,72 +1,346 @@
 #!/usr/bin/env python3
 
+import argparse
+import signal
 import sys
+from Runtime.Optimizer import optimize
+from Runtime.Tape import Tape, MappedTape, BFRuntimeError, DEFAULT_TAPE_SIZE
+from Runtime.Streams import get_output_sink, get_input_source, OutputSink, CaptureOutput, FeedInput, OUTPUT_BUFFER_MODES, EOF_POLICIES, DEFAULT_OUTPUT_BUFFER_SIZE
+from Runtime.Executor import ExecutionState, Budget
+from Runtime.Profiler import Profile, DEFAULT_TOP_LOOPS
+from Runtime import Executor, JIT, Profiler, Snapshot, Cache, Native
 
+# ir - dispatch loop over the optimized instructions, jit - translate them to a Python function, native - translate them to C and build it
+ENGINES = ["ir", "jit", "native"]
 
-def create_jumps_dictionary(program):
-    lbraces = list()
-    res = dict()
-
-    for index, command in enumerate(program):
-        if command == '[':
-            lbraces.append(index)
-        elif command == ']':
-            if len(lbraces) == 0:
-                raise SyntaxError("Brainfuck: mismatched parentheses")
-
-            lbrace_index = lbraces.pop()
-            res[lbrace_index] = index
-            res[index] = lbrace_index
-
-    return res
-
-
-def brainfuck(program):
-
-    jumps = create_jumps_dictionary(program)
-    data = dict()
-    data_pointer = 0
-
-    instruction_pointer = 0
-
-    while instruction_pointer < len(program):
-        command = program[instruction_pointer]
-
-        if command == '>':
-            data_pointer += 1
-        elif command == '<':
-            data_pointer -= 1
-        elif command == '+':
-            data[data_pointer] = (data.get(data_pointer, 0) + 1)
-            if data[data_pointer] == 256:
-                data[data_pointer] = 0
-        elif command == '-':
-            data[data_pointer] = (data.get(data_pointer, 0) - 1)
-            if data[data_pointer] == -1:
-                data[data_pointer] = 255
-        elif command == ',':
-            data[data_pointer] = ord(sys.stdin.read(1)) % 256
-        elif command == '.':
-            print(chr(data.get(data_pointer, 0)), end='', flush=True)
-        elif command == '[':
-            if data.get(data_pointer, 0) == 0:
-                instruction_pointer = jumps[instruction_pointer]
-        elif command == ']':
-            if data.get(data_pointer, 0) != 0:
-                instruction_pointer = jumps[instruction_pointer]
-        else:  # everything else is comment
+
+def brainfuck(program, tape_size=DEFAULT_TAPE_SIZE, max_tape=None, engine="ir", output_buffer="line", output=None, input_bytes=None, eof="unchanged",
+              max_steps=None, timeout=None, state=None, profile=None, snapshot_file=None, mapped_tape=False, tape_file=None,
+              use_cache=False, intrinsics=False):
+    """
+    :param program: Brainfuck code (string), or its optimized instructions (then profile and snapshot_file cannot be used)
+    :param tape_size: initial amount of cells on the tape
+    :param max_tape: the tape never grows beyond this amount of cells (None means no limit)
+    :param engine: one of ENGINES
+    :param output_buffer: how output to the standard output is buffered, one of OUTPUT_BUFFER_MODES
+    :param output: where the output goes instead of the standard output:
+                   a sink (e.g Runtime.Streams.CaptureOutput) or a callable that receives output chunks (bytes)
+    :param input_bytes: the whole input (bytes), instead of reading from the standard input
+    :param eof: what ',' does at the end of the input, one of EOF_POLICIES
+    :param max_steps: stop after executing this amount of (optimized) instructions (None means no limit)
+    :param timeout: stop after running this amount of seconds (None means no limit)
+    :param state: an ExecutionState returned by an earlier call with the same program (or loaded by Runtime.Snapshot.load),
+                  to continue from where it stopped (tape_size and max_tape are ignored, the state's tape is used,
+                  and moved to a memory mapping if mapped_tape or tape_file is given and it is not mapped already,
+                  and unless input_bytes is given, the input continues from where it stopped)
+    :param profile: a Runtime.Profiler.Profile to count the executed instructions in (the engine is ignored, the profiler runs the code)
+    :param snapshot_file: when the process receives SIGUSR1, a snapshot of the run is saved to this file, and the run continues
+    :param mapped_tape: hold the tape in an anonymous memory mapping instead of a bytearray (only touched cells use memory)
+    :param tape_file: hold the tape in a memory mapping of this file (it is overwritten), so it can be inspected during and after the run
+                      (a mapping is closed when the program halts or fails, so only a run that stopped keeps it, to be continued)
+    :param use_cache: keep the optimized instructions in the on-disk cache (Runtime/Cache.py), so the next run of this program starts faster
+    :param intrinsics: run the fragments that the compiler wrapped in intrinsic hints natively (see Runtime/Intrinsics.py).
+                       off by default, so hints are comments, like in any other Brainfuck interpreter
+    :return: the ExecutionState. its status tells whether the program halted or why it stopped
+             (the native engine runs in another process, so its state holds neither the tape nor the step count)
+    """
+    if engine not in ENGINES:
+        raise ValueError("Unknown engine '%s' (expected one of: %s)" % (engine, ", ".join(ENGINES)))
+
+    if not isinstance(program, str):
+        if profile is not None or snapshot_file is not None:
+            raise ValueError("profile and snapshot_file need the program's code, not its optimized instructions")
+        code = program
+    elif profile is not None:
+        code = profile.prepare(program, intrinsics)
+    elif use_cache:
+        code = Cache.get_code(program, intrinsics=intrinsics)
+    else:
+        code = optimize(program, intrinsics=intrinsics)
+
+    if engine == "native" and profile is None:
+        if max_steps is not None or state is not None or snapshot_file is not None or mapped_tape or tape_file is not None:
+            raise ValueError("The native engine does not support max_steps, state, snapshot_file, mapped_tape and tape_file")
+        sink = get_output_sink(output, output_buffer) if output is not None else None  # None - the native program writes to the standard output itself
+        halted = Native.execute(code, sink, input_bytes, eof, tape_size, max_tape, output_buffer, timeout)
+        if sink is not None:
+            sink.flush()
+        state = ExecutionState(Tape(1), instruction_pointer=len(code) if halted else 0)
+        state.status = Executor.HALTED if halted else Executor.TIMEOUT
+        return state
+
+    mapped = None  # the mapped tape that this run created (and closes when it ends)
+    if state is None:
+        if mapped_tape or tape_file is not None:
+            tape = mapped = MappedTape(tape_size, max_tape, tape_file)
+        else:
+            tape = Tape(tape_size, max_tape)
+        state = ExecutionState(tape)
+    elif (mapped_tape or tape_file is not None) and not isinstance(state.tape, MappedTape):
+        cells = state.tape.data[:].rstrip(b"\0")
+        mapped = MappedTape(len(state.tape.data), state.tape.max_size, tape_file)
+        mapped.data[:len(cells)] = cells
+        state.tape = mapped
+    output = get_output_sink(output, output_buffer)
+    if input_bytes is not None or state.input_source is None:
+        state.input_source = get_input_source(input_bytes, eof)
+    input_source = state.input_source
+    input_source.before_read = output.flush  # show everything (e.g a prompt) before reading input
+
+    for value in state.pending_output:  # output that was not written when the snapshot was taken
+        output.write(value)
+    state.pending_output = b""
+
+    budget = Budget(state.steps, max_steps, timeout, interruptible=snapshot_file is not None)
+    snapshot_signal = getattr(signal, "SIGUSR1", None) if snapshot_file is not None else None  # there is no SIGUSR1 on Windows
+    if snapshot_signal is not None:
+        previous_handler = signal.signal(snapshot_signal, lambda signal_number, frame: budget.interrupt())
+
+    jit_functions = dict()  # the JIT's compiled functions, kept for continuing after a snapshot
+    try:
+        while True:
+            if profile is not None:
+                Profiler.execute(code, state, output.write, input_source.read, budget, profile)
+            elif engine == "jit":
+                JIT.execute(code, state, output.write, input_source.read, budget, jit_functions)
+            else:
+                Executor.execute(code, state, output.write, input_source.read, budget)
+
+            if state.status != Executor.INTERRUPTED or snapshot_file is None:
+                return state
+            Snapshot.save(snapshot_file, program, state, output, intrinsics)
+    finally:
+        if snapshot_signal is not None:
+            signal.signal(snapshot_signal, previous_handler)
+        output.flush()
+        if mapped is not None and (state.halted or state.status == Executor.RUNNING):
+            mapped.close()  # the program halted or failed (an error leaves it running), so nothing continues it
+
+
+class Interpreter:
+    """
+    a program that is kept in memory and run a slice at a time, e.g by a service that hosts warm interpreters in-process
+    (instead of starting a new Interpreter.py, which parses and optimizes the program again, for every request)
+
+    input is given by feed() (and close_input() at its end), and the output is kept until drain() takes it:
+        interpreter = Interpreter(program)
+        interpreter.feed(b"2+3\n")
+        while interpreter.run(max_steps=100000) == Executor.STEP_LIMIT:
             pass
+        output = interpreter.drain()
+    """
 
-        instruction_pointer += 1
+    def __init__(self, program, engine="ir", tape_size=DEFAULT_TAPE_SIZE, max_tape=None, eof="unchanged", use_cache=False, output=None, intrinsics=False):
+        """
+        :param program: Brainfuck code (string)
+        :param engine: "ir" or "jit" (the native engine runs in another process, so it cannot be run a slice at a time)
+        :param tape_size, max_tape, eof, use_cache, intrinsics: as in brainfuck()
+        :param output: a sink (or a callable that receives output chunks) to pass the output to, instead of keeping it for drain()
+        """
+        if engine not in ("ir", "jit"):
+            raise ValueError("The Interpreter class supports the ir and jit engines (got '%s')" % engine)
 
+        self.code = Cache.get_code(program, intrinsics=intrinsics) if use_cache else optimize(program, intrinsics=intrinsics)
+        self.engine = engine
+        self.jit_functions = dict()  # the JIT's compiled functions (by the instruction they start from), kept between runs
+        self.output = get_output_sink(output) if output is not None else CaptureOutput()
+        self.input_source = FeedInput(eof)
+        self.state = ExecutionState(Tape(tape_size, max_tape), input_source=self.input_source)
+        self.error = None  # the error that a run failed with (the state is not updated when a run fails, so it cannot be continued)
+
+    def run(self, max_steps=None, timeout=None):
+        """
+        runs the program until it halts, needs input that was not fed yet, or runs max_steps more steps (or timeout seconds)
+        :return: the status the run stopped with: Executor.HALTED, Executor.NEEDS_INPUT, Executor.STEP_LIMIT or Executor.TIMEOUT
+        raises BFRuntimeError if the program fails (e.g moves left of cell 0), and on every run() after that
+        """
+        state = self.state
+        if state.halted:
+            return state.status
+        if self.error is not None:
+            raise BFRuntimeError("%s (the program failed, so it cannot continue)" % self.error)
+
+        budget = Budget(state.steps, max_steps, timeout)
+        try:
+            if self.engine == "jit":
+                JIT.execute(self.code, state, self.output.write, self.input_source.read, budget, self.jit_functions)
+            else:
+                Executor.execute(self.code, state, self.output.write, self.input_source.read, budget)
+        except Exception as error:
+            self.error = error
+            raise
+        return state.status
+
+    def feed(self, data):
+        # adds input (bytes) after the input that was fed before
+        self.input_source.feed(data)
+
+    def close_input(self):
+        # marks the end of the input. from now on, ',' at the end of the input follows the EOF policy instead of stopping the run
+        self.input_source.close()
+
+    def drain(self):
+        # returns the output that was produced since the last drain() (when no output sink was given)
+        return self.output.drain()
+
+    @property
+    def status(self):
+        return self.state.status
+
+    @property
+    def steps(self):
+        return self.state.steps
+
+    @property
+    def data_pointer(self):
+        return self.state.data_pointer
+
+    @property
+    def tape(self):
+        """
+        a memoryview of the cells (without copying them), which can be read and written between runs
+        the tape cannot grow while a view of it exists (a run that needs to grow it fails),
+        so release the view (or use it in a 'with' block) before the next run()
+        """
+        return memoryview(self.state.tape.data)
 
-if __name__ == '__main__':
-    if len(sys.argv) != 2:
-        print("Usage: '%s' <path_to_brainfuck_code_file>" % sys.argv[0])
-        exit(0)
 
-    fpath = sys.argv[1]
+def iter_output(program, input_data=b"", chunk_size=DEFAULT_OUTPUT_BUFFER_SIZE, yield_steps=Executor.DEFAULT_YIELD_STEPS, **options):
+    """
+    runs the program, and yields its output in chunks (bytes) while it runs
+    a chunk is yielded when chunk_size bytes were written, and the rest of the output when the program waits for input or halts
+    the output of one program can be the input of another: iter_output(second, iter_output(first, data))
+    :param input_data: the whole input (bytes), or an iterable of input chunks that are taken only when the program needs them
+    :param chunk_size: the amount of bytes in a chunk
+    :param yield_steps: the chunks that are ready are yielded at least once every yield_steps steps
+    :param options: passed to Interpreter (engine, tape_size, max_tape, eof, use_cache, intrinsics)
+    raises BFRuntimeError if the program fails (after yielding the output it wrote before that)
+    """
+    chunks = []
+    output = OutputSink(chunks.append, buffer_size=chunk_size, flush_on_newline=False)
+    interpreter = Interpreter(program, output=output, **options)
+    if isinstance(input_data, (bytes, bytearray)):
+        input_data = [input_data]
+    input_chunks = iter(input_data)
+
+    while True:
+        try:
+            status = interpreter.run(yield_steps)
+        except BFRuntimeError:
+            output.flush()
+            yield from chunks
+            raise
+
+        if status != Executor.STEP_LIMIT:
+            output.flush()
+        yield from chunks
+        chunks.clear()
+
+        if status == Executor.HALTED:
+            return
+        elif status == Executor.NEEDS_INPUT:
+            chunk = next(input_chunks, None)
+            if chunk is None:
+                interpreter.close_input()
+            else:
+                interpreter.feed(chunk)
+
+
+def add_interpreter_arguments(parser):
+    # options shared by Interpreter.py and 'BF-it.py -r'
+    parser.add_argument("--tape-size", dest="tape_size", metavar="CELLS", type=int, default=DEFAULT_TAPE_SIZE, help="Initial amount of cells on the tape (default: %(default)s). The tape grows when needed")
+    parser.add_argument("--max-tape", dest="max_tape", metavar="CELLS", type=int, default=None, help="Maximal amount of cells the tape may grow to (default: no limit)")
+    parser.add_argument("--mapped-tape", dest="mapped_tape", action="store_true", help="Hold the tape in an anonymous memory mapping (only the cells that are used take memory)")
+    parser.add_argument("--tape-file", dest="tape_file", metavar="FILE", default=None, help="Hold the tape in a memory mapping of FILE (which is overwritten), so it can be inspected during and after the run")
+    parser.add_argument("--output-buffer", dest="output_buffer", choices=OUTPUT_BUFFER_MODES, default="line", help="When output is written: 'none' after every byte, 'line' on every newline, 'full' when the buffer is full. Output is always written before reading input (default: %(default)s)")
+    parser.add_argument("-i", "--input", dest="input_file", metavar="FILE", default=None, help="Read the input from FILE instead of the standard input")
+    parser.add_argument("--eof", dest="eof", choices=EOF_POLICIES, default="unchanged", help="What ',' does at the end of the input: leave the cell unchanged, or set it to 0 or 255 (default: %(default)s)")
+    parser.add_argument("--engine", dest="engine", choices=ENGINES, default="ir", help="How to execute the code: 'ir' runs a dispatch loop over the optimized instructions, 'jit' translates them to a Python function first, 'native' translates them to C and builds them with the system's C compiler (default: %(default)s)")
+    parser.add_argument("--intrinsics", dest="intrinsics", action="store_true", help="Run the fragments that were compiled with 'BF-it.py --intrinsic-hints' natively (without it, hints are comments, like in any Brainfuck interpreter)")
+    parser.add_argument("--no-cache", dest="no_cache", action="store_true", help="Do not keep the optimized program in the cache directory (%s)" % Cache.get_cache_directory().replace("%", "%%"))
+    parser.add_argument("--max-steps", dest="max_steps", metavar="STEPS", type=int, default=None, help="Stop after executing STEPS optimized instructions (default: no limit)")
+    parser.add_argument("--timeout", dest="timeout", metavar="SECONDS", type=float, default=None, help="Stop after running for SECONDS seconds (default: no limit)")
+    parser.add_argument("--snapshot", dest="snapshot_file", metavar="FILE", default=None, help="When the process receives SIGUSR1, save a snapshot of the run to FILE (and keep running)")
+
+
+def get_interpreter_options(args):
+    # returns the keyword arguments for brainfuck() that were given by add_interpreter_arguments
+    # exits with 1 if the input file cannot be read
+    input_bytes = None
+    if args.input_file is not None:
+        try:
+            with open(args.input_file, "rb") as f:
+                input_bytes = f.read()
+        except OSError as e:
+            print(e, file=sys.stderr)
+            exit(1)
+
+    return dict(tape_size=args.tape_size, max_tape=args.max_tape, engine=args.engine, output_buffer=args.output_buffer,
+                input_bytes=input_bytes, eof=args.eof, max_steps=args.max_steps, timeout=args.timeout, snapshot_file=args.snapshot_file, mapped_tape=args.mapped_tape, tape_file=args.tape_file,
+                use_cache=not args.no_cache, intrinsics=args.intrinsics)
+
+
+def run_from_command_line(program, **options):
+    """
+    runs the program with brainfuck(), for the command line tools (Interpreter.py and 'BF-it.py -r')
+    if the program failed (or its tape file cannot be created), prints the error to the standard error and exits with 1
+    if it stopped before halting (max_steps, timeout), prints why to the standard error and exits with 2
+    :return: the ExecutionState of the halted program
+    """
+    try:
+        state = brainfuck(program, **options)
+    except (SyntaxError, BFRuntimeError, ValueError, OSError) as e:
+        print("\n%s" % e, file=sys.stderr)
+        exit(1)
+
+    if not state.halted:
+        print("\nBrainfuck: stopped, %s" % state, file=sys.stderr)
+        exit(2)
+    return state
+
+
+def process_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("filepath", metavar="brainfuck_file", nargs=1, help="Path to the Brainfuck code file")
+    add_interpreter_arguments(parser)
+    parser.add_argument("--serve", dest="serve_port", metavar="PORT", type=int, default=None, help="Instead of running the program once, run a session of it for every connection to localhost:PORT")
+    parser.add_argument("--restore", dest="restore_file", metavar="FILE", default=None, help="Continue the run that was saved to the snapshot FILE (by --snapshot). With --tape-file or --mapped-tape, the restored tape is held in a memory mapping")
+    parser.add_argument("--profile", action="store_true", help="Count the executed instructions, and print the hottest loops to the standard error when the program ends")
+    parser.add_argument("--profile-top", dest="profile_top", metavar="N", type=int, default=DEFAULT_TOP_LOOPS, help="Amount of loops in the profile report (default: %(default)s)")
+    parser.add_argument("--profile-json", dest="profile_json", metavar="FILE", default=None, help="Write the whole profile to FILE as JSON (implies --profile)")
+
+    args = parser.parse_args()
+    return args.filepath[0], get_interpreter_options(args), args
+
+
+if __name__ == '__main__':
+    fpath, options, args = process_args()
     with open(fpath, "rt") as f:
         code = f.read()
 
-    brainfuck(code)
+    if args.serve_port is not None:
+        import asyncio  # (only a server needs asyncio, which takes a while to import)
+        from Runtime import AsyncInterpreter
+        try:
+            asyncio.run(AsyncInterpreter.serve(code, port=args.serve_port, eof=args.eof, tape_size=args.tape_size, max_tape=args.max_tape, intrinsics=args.intrinsics))
+        except KeyboardInterrupt:
+            pass
+        exit(0)
+
+    state = None
+    if args.restore_file is not None:
+        try:
+            state = Snapshot.load(args.restore_file, code, args.intrinsics)
+        except (OSError, ValueError) as e:
+            print(e, file=sys.stderr)
+            exit(1)
+
+    profile = Profile() if args.profile or args.profile_json else None
+    try:
+        run_from_command_line(code, state=state, profile=profile, **options)
+    finally:
+        if profile is not None and profile.code is not None:  # a profile of a run that failed (or stopped) is still useful
+            print("\n" + profile.get_report(args.profile_top), file=sys.stderr)
+            if args.profile_json is not None:
+                with open(args.profile_json, "wt") as f:
+                    f.write(profile.to_json())
@@ -0,0 +1,67 @@
+import asyncio
+from Runtime.Optimizer import optimize
+from Runtime.Tape import Tape, BFRuntimeError, DEFAULT_TAPE_SIZE
+from Runtime.Streams import OutputSink, FeedInput, DEFAULT_INPUT_CHUNK_SIZE
+from Runtime.Executor import ExecutionState, Budget, DEFAULT_YIELD_STEPS
+from Runtime import Executor
+
+"""
+This file implements an asyncio version of the interpreter, so one process can run many interactive programs at once
+
+The program is run in slices of (at most) yield_steps steps by the "ir" engine
+Between two slices the output is written, and control goes back to the event loop
+When the program reaches a ',' and there is no input, the slice stops there, and the input is awaited
+"""
+
+
+async def run(program, reader, writer, eof="unchanged", yield_steps=DEFAULT_YIELD_STEPS, tape_size=DEFAULT_TAPE_SIZE, max_tape=None):
+    """
+    :param program: Brainfuck code (string), or its optimized instructions (so sessions of the same program share them)
+    :param reader: where the input comes from, e.g asyncio.StreamReader (anything with 'async read(n)' that returns b"" at the end)
+    :param writer: where the output goes, e.g asyncio.StreamWriter (anything with 'write(bytes)' and 'async drain()')
+    :param eof: what ',' does at the end of the input, one of EOF_POLICIES
+    :param yield_steps: the amount of steps after which control goes back to the event loop
+    :return: the ExecutionState of the finished program
+    """
+    code = optimize(program) if isinstance(program, str) else program
+    output = OutputSink(writer.write, flush_on_newline=False)  # flushed after every slice
+    input_source = FeedInput(eof)
+    state = ExecutionState(Tape(tape_size, max_tape), input_source=input_source)
+
+    while True:
+        Executor.execute(code, state, output.write, input_source.read, Budget(state.steps, yield_steps))
+        output.flush()
+        await writer.drain()
+
+        if state.status == Executor.HALTED:
+            return state
+        elif state.status == Executor.NEEDS_INPUT:
+            chunk = await reader.read(DEFAULT_INPUT_CHUNK_SIZE)
+            if len(chunk) == 0:
+                input_source.close()
+            else:
+                input_source.feed(chunk)
+        else:
+            await asyncio.sleep(0)  # let the other sessions run
+
+
+async def serve(program, host="127.0.0.1", port=8000, intrinsics=False, **options):
+    """
+    runs a session of the program for every connection to host:port, until cancelled
+    :param intrinsics: as in Interpreter.brainfuck()
+    :param options: passed to run()
+    """
+    code = optimize(program, intrinsics=intrinsics)  # once, for all the sessions
+
+    async def run_session(reader, writer):
+        try:
+            await run(code, reader, writer, **options)
+        except BFRuntimeError as e:
+            writer.write(("\n%s\n" % e).encode("utf8"))
+        except ConnectionError:
+            return
+        writer.close()
+
+    server = await asyncio.start_server(run_session, host, port)
+    async with server:
+        await server.serve_forever()
@@ -0,0 +1,89 @@
+import hashlib
+import os
+import struct
+import sys
+from array import array
+from Runtime.Optimizer import optimize, OPTIMIZER_VERSION
+
+"""
+This file keeps the optimized instructions of programs on disk, so running the same program again skips the optimizer
+
+Every program is cached in a file of its own, named after the hash of the program, the optimizer version
+and whether intrinsic hints are followed (so a changed program, or a new optimizer, never uses stale instructions)
+A cache file (.bfc) is made of:
+    MAGIC
+    a header  - the optimizer version, the amount of instructions, and the hash of the program
+    the instructions - (opcode, argument, offset) of every instruction, packed as little-endian 32-bit integers
+"""
+
+MAGIC = b"BFC1"
+HEADER = struct.Struct("<II32s")  # optimizer version, amount of instructions, sha256 of the program
+
+
+def get_cache_directory():
+    # $XDG_CACHE_HOME/bf-it, or ~/.cache/bf-it
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "bf-it")
+
+
+def get_cache_path(program, directory=None, intrinsics=False):
+    digest = hashlib.sha256(program.encode("utf8")).hexdigest()
+    return os.path.join(directory or get_cache_directory(), "%s-v%d%s.bfc" % (digest, OPTIMIZER_VERSION, "-intrinsics" if intrinsics else ""))
+
+
+def pack(program, code):
+    # returns the content of the cache file of the instructions
+    values = array('i')
+    for instruction in code:
+        values.extend(instruction)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return MAGIC + HEADER.pack(OPTIMIZER_VERSION, len(code), hashlib.sha256(program.encode("utf8")).digest()) + values.tobytes()
+
+
+def unpack(program, content):
+    # returns the instructions in the content of a cache file, or None if it does not hold the instructions of the program
+    header_end = len(MAGIC) + HEADER.size
+    if not content.startswith(MAGIC) or len(content) < header_end:
+        return None
+    version, length, digest = HEADER.unpack_from(content, len(MAGIC))
+    if version != OPTIMIZER_VERSION or digest != hashlib.sha256(program.encode("utf8")).digest():
+        return None
+
+    values = array('i')
+    if len(content) - header_end != length * 3 * values.itemsize:  # a file that was cut
+        return None
+    values.frombytes(content[header_end:])
+    if sys.byteorder != "little":
+        values.byteswap()
+    return list(zip(values[0::3], values[1::3], values[2::3]))
+
+
+def get_code(program, directory=None, intrinsics=False):
+    """
+    returns the optimized instructions of the program, from the cache if they are there
+    otherwise runs the optimizer and saves the instructions to the cache (if the cache directory is writable)
+    :param directory: where the cache files are (default: get_cache_directory())
+    :param intrinsics: as in optimize()
+    """
+    path = get_cache_path(program, directory, intrinsics)
+    try:
+        with open(path, "rb") as f:
+            code = unpack(program, f.read())
+        if code is not None:
+            return code
+    except OSError:
+        pass
+
+    code = optimize(program, intrinsics=intrinsics)
+    try:
+        content = pack(program, code)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = "%s.%d.tmp" % (path, os.getpid())  # other processes may write the same file at the same time
+        with open(temporary_path, "wb") as f:
+            f.write(content)
+        os.replace(temporary_path, path)
+    except (OSError, OverflowError):  # a read-only cache, or a move too long to pack, just means no caching
+        pass
+
+    return code
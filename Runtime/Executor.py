@@ -0,0 +1,191 @@
+import sys
+import time
+from Runtime.Optimizer import ADD, MOVE, OUT, IN, OPEN, CLOSE, CLEAR, MUL, SCAN, INTRINSIC
+from Runtime.Tape import scan
+from Runtime.Intrinsics import FUNCTIONS as INTRINSIC_FUNCTIONS
+
+"""
+This file implements the "ir" engine - a dispatch loop over the optimized instructions
+And the execution state, which lets a run stop when it exceeds its limits (steps or time) and continue later
+
+A step is one executed instruction of the IR
+Steps are counted only when a jump is taken, and the limits are checked only at loop back-edges (a CLOSE that jumps back),
+so the limits cost (almost) nothing in the hot loop
+"""
+
+# the status of an execution state
+RUNNING = "running"  # has not finished yet (it was never run, or it is being run)
+HALTED = "halted"  # reached the end of the program
+STEP_LIMIT = "max_steps"  # stopped because it ran max_steps steps
+TIMEOUT = "timeout"  # stopped because it ran longer than timeout seconds
+INTERRUPTED = "interrupted"  # stopped because Budget.interrupt() was called (e.g by a signal handler)
+NEEDS_INPUT = "needs_input"  # stopped at a ',' because the input source has no input yet (its read() returned None)
+
+TIME_CHECK_INTERVAL = 100000  # amount of steps between two checks of the clock
+DEFAULT_YIELD_STEPS = 100000  # amount of steps in a slice of a program that is run a slice at a time (e.g by AsyncInterpreter)
+NO_LIMIT = sys.maxsize
+
+
+class ExecutionState:
+    """
+    everything that is needed to continue running a program:
+    the tape, the index of the next instruction to execute, the data pointer, and how many steps were executed so far
+    and the input source the program reads from (so a continued run continues reading where it stopped),
+    and output that was produced but not written yet (only when restored from a snapshot)
+    """
+
+    def __init__(self, tape, instruction_pointer=0, data_pointer=0, steps=0, input_source=None, pending_output=b""):
+        self.tape = tape
+        self.instruction_pointer = instruction_pointer
+        self.data_pointer = data_pointer
+        self.steps = steps
+        self.status = RUNNING
+        self.input_source = input_source
+        self.pending_output = pending_output
+
+    @property
+    def halted(self):
+        return self.status == HALTED
+
+    def __str__(self):
+        return "%s after %s steps (instruction %s, cell %s)" % (self.status, self.steps, self.instruction_pointer, self.data_pointer)
+
+
+class Budget:
+    """
+    decides when a run should stop: after max_steps more steps, or after timeout seconds (None means no limit)
+    an interruptible budget also stops the run soon after interrupt() is called
+    """
+
+    def __init__(self, steps=0, max_steps=None, timeout=None, interruptible=False):
+        self.step_limit = steps + max_steps if max_steps is not None else None
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+        self.interruptible = interruptible
+        self.interrupted = False
+
+    def interrupt(self):
+        # safe to call from a signal handler. the run stops at the next check, with the status INTERRUPTED
+        self.interrupted = True
+
+    def get_next_check(self, steps):
+        # returns the amount of steps at which the executor should call get_stop_reason next time
+        periodic = self.deadline is not None or self.interruptible
+        next_check = steps + TIME_CHECK_INTERVAL if periodic else NO_LIMIT
+        if self.step_limit is not None:
+            next_check = min(next_check, self.step_limit)
+        return next_check
+
+    def get_stop_reason(self, steps):
+        # returns the status the run should stop with, or None if it may continue
+        if self.step_limit is not None and steps >= self.step_limit:
+            return STEP_LIMIT
+        if self.interrupted:
+            self.interrupted = False
+            return INTERRUPTED
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return TIMEOUT
+        return None
+
+
+def execute(code, state, write, read, budget=None):
+    """
+    runs the instructions from the state's instruction pointer until the program ends or the budget runs out
+    updates the state (and sets its status accordingly) and returns it
+    """
+    if budget is None:
+        budget = Budget()
+
+    tape = state.tape
+    data = tape.data
+    size = len(data)
+    data_pointer = state.data_pointer
+    instruction_pointer = state.instruction_pointer
+
+    steps = state.steps
+    run_start = instruction_pointer  # the instructions from here up to instruction_pointer were executed but not counted yet
+    next_check = budget.get_next_check(steps)
+    state.status = RUNNING
+
+    while instruction_pointer < len(code):
+        command, argument, offset = code[instruction_pointer]
+
+        if command == ADD:
+            target = data_pointer + offset
+            if target < 0 or target >= size:
+                data = tape.ensure(target)
+                size = len(data)
+            data[target] = (data[target] + argument) % 256
+        elif command == MOVE:
+            data_pointer += argument
+            if data_pointer < 0 or data_pointer >= size:
+                data = tape.ensure(data_pointer)
+                size = len(data)
+        elif command == CLEAR:
+            target = data_pointer + offset
+            if target < 0 or target >= size:
+                data = tape.ensure(target)
+                size = len(data)
+            data[target] = 0
+        elif command == MUL:
+            value = data[data_pointer]
+            if value != 0:
+                target = data_pointer + offset
+                if target < 0 or target >= size:
+                    data = tape.ensure(target)
+                    size = len(data)
+                data[target] = (data[target] + argument * value) % 256
+        elif command == SCAN:
+            data_pointer = scan(data, data_pointer, argument)
+            if data_pointer < 0 or data_pointer >= size:
+                data = tape.ensure(data_pointer)
+                size = len(data)
+        elif command == OPEN:
+            if data[data_pointer] == 0:
+                steps += instruction_pointer + 1 - run_start
+                instruction_pointer = argument
+                run_start = argument + 1
+        elif command == CLOSE:
+            if data[data_pointer] != 0:
+                steps += instruction_pointer + 1 - run_start
+                instruction_pointer = argument
+                run_start = argument + 1
+
+                if steps >= next_check:  # back-edge: check the budget
+                    status = budget.get_stop_reason(steps)
+                    if status is not None:
+                        state.instruction_pointer, state.data_pointer, state.steps = argument + 1, data_pointer, steps
+                        state.status = status
+                        return state
+                    next_check = budget.get_next_check(steps)
+        elif command == OUT:
+            target = data_pointer + offset
+            if target < 0 or target >= size:
+                data = tape.ensure(target)
+                size = len(data)
+            write(data[target])
+        elif command == IN:
+            target = data_pointer + offset
+            if target < 0 or target >= size:
+                data = tape.ensure(target)
+                size = len(data)
+            value = read(data[target])
+            if value is None:  # stop before the ',', it is executed again when the run continues
+                state.instruction_pointer, state.data_pointer, state.steps = instruction_pointer, data_pointer, steps + instruction_pointer - run_start
+                state.status = NEEDS_INPUT
+                return state
+            data[target] = value
+        elif command == INTRINSIC:
+            new_data_pointer = INTRINSIC_FUNCTIONS[offset](tape, data_pointer, write)
+            if new_data_pointer is not None:  # skip the fragment (otherwise it runs)
+                data_pointer = new_data_pointer
+                data = tape.data
+                size = len(data)
+                steps += instruction_pointer + 1 - run_start
+                instruction_pointer = argument - 1
+                run_start = argument
+
+        instruction_pointer += 1
+
+    state.instruction_pointer, state.data_pointer, state.steps = len(code), data_pointer, steps + len(code) - run_start
+    state.status = HALTED
+    return state
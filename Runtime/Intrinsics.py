@@ -0,0 +1,123 @@
+import re
+
+"""
+This file implements the intrinsics - native versions of fragments of Brainfuck code that the compiler emits,
+which the interpreter runs instead of the fragments' loops (divmod, for example, loops <a> times)
+
+When compiling with intrinsic hints (BF-it.py --intrinsic-hints), the compiler wraps every such fragment in a hint:
+    {<name>:<fragment>}
+Brainfuck ignores every character that is not a command, so the compiled code is still standard Brainfuck,
+and other interpreters just run the fragments
+
+When asked to (optimize(intrinsics=True), Interpreter.py --intrinsics), the optimizer turns every hint into an INTRINSIC
+instruction that comes before the fragment's instructions (otherwise hints are comments, like in any other interpreter)
+It calls the native version, and skips the fragment. When the native version cannot do what the fragment does
+(e.g divmod by 0, which prints an error, or a fragment that would move the data pointer out of the tape), it returns None,
+and the fragment runs instead
+
+Every native version receives the tape, the data pointer at the start of the fragment, and a callable that outputs a value
+It returns the data pointer at the end of the fragment, and leaves the cells exactly as the fragment would (temporary cells included)
+"""
+
+HINT_PATTERN = re.compile(r"\{(\w+):|[\[\]}]")  # the start of a hint, the end of a hint, and the brackets (to check that a fragment is whole)
+
+
+def get_cells(tape, last_cell):
+    # returns the tape's buffer, grown to hold last_cell, or None if the tape may not grow that far (then the fragment fails by itself)
+    if tape.max_size is not None and last_cell >= tape.max_size:
+        return None
+    return tape.ensure(last_cell)
+
+
+def divmod_cells(tape, p, write):
+    # a, b --> 0, b-a%b, a%b, a/b, 0, 0 (see get_divmod_code)
+    data = get_cells(tape, p + 5)
+    if data is None or data[p + 1] == 0:  # the fragment prints the division by zero error
+        return None
+
+    a, b = data[p], data[p + 1]
+    data[p:p + 6] = bytes((0, b - a % b, a % b, a // b, 0, 0))
+    return p
+
+
+def print_int(tape, p, write):
+    # return_cell, value --> the value is printed in decimal, and the 10 cells after it are zeroed (see get_printint_code)
+    data = get_cells(tape, p + 11)
+    if data is None:
+        return None
+
+    for digit in b"%d" % data[p + 1]:
+        write(digit)
+    data[p + 2:p + 12] = bytes(10)
+    return p
+
+
+def move_right_index_cells(tape, p, write):
+    # index, counter (pointing to counter) --> index+1 zeros, index (pointing after it) (see get_move_right_index_cells_code)
+    if p < 1:
+        return None
+    index = tape.data[p - 1]
+    data = get_cells(tape, p + index + 1)
+    if data is None:
+        return None
+
+    data[p - 1:p + index] = bytes(index + 1)
+    data[p + index] = index
+    return p + index + 1
+
+
+def move_left_index_cell(tape, p, write):
+    # value, index (pointing to index) --> moves the value <index> cells left, adding the cells it passes to it,
+    # and zeros the cells it left (see get_move_left_index_cell_code)
+    data = tape.data
+    index = data[p]
+    if index == 0:
+        return p
+    if p - index - 1 < 0:
+        return None
+
+    data[p - index - 1] = sum(data[p - index - 1:p]) % 256
+    data[p - index:p + 1] = bytes(index + 1)
+    return p - index
+
+
+# the IR holds the number of an intrinsic (its index here), so changing this list changes OPTIMIZER_VERSION
+INTRINSICS = [
+    ("divmod", divmod_cells),
+    ("printint", print_int),
+    ("index_right", move_right_index_cells),
+    ("index_left", move_left_index_cell),
+]
+NUMBERS = {name: number for number, (name, _) in enumerate(INTRINSICS)}
+FUNCTIONS = [function for _, function in INTRINSICS]
+
+
+def get_hints(program):
+    """
+    finds the hints in the program
+    a hint whose fragment is not a whole piece of code (it has a bracket whose match is outside it), or whose name is unknown, is ignored
+    :return: dict of index of a hint's '{' --> (number of its intrinsic, index of its '}')
+    """
+    hints = dict()
+    if "{" not in program:
+        return hints
+
+    open_hints = []  # (index of '{', intrinsic number, bracket depth) of the hints we are in
+    depth = 0
+    for match in HINT_PATTERN.finditer(program):
+        token = match.group()
+        if token == "[":
+            depth += 1
+        elif token == "]":
+            depth -= 1
+            while len(open_hints) > 0 and open_hints[-1][2] > depth:  # a loop that started before the hint ends inside it
+                open_hints.pop()
+        elif token == "}":
+            if len(open_hints) > 0:
+                start, number, start_depth = open_hints.pop()
+                if number is not None and start_depth == depth:  # (otherwise a loop that started inside the hint continues after it)
+                    hints[start] = (number, match.start())
+        else:
+            open_hints.append((match.start(), NUMBERS.get(match.group(1)), depth))
+
+    return hints
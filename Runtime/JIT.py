@@ -0,0 +1,237 @@
+from Runtime.Optimizer import ADD, MOVE, OUT, IN, OPEN, CLEAR, MUL, SCAN, INTRINSIC
+from Runtime.Tape import scan
+from Runtime.Intrinsics import FUNCTIONS as INTRINSIC_FUNCTIONS
+from Runtime import Executor
+
+"""
+This file implements the "jit" engine
+It translates the IR into the source code of a Python function, compiles it with compile() and runs it
+
+Every instruction becomes one line of straight Python code that works on local variables,
+and every loop becomes a 'while t[p]:' block, so nothing is dispatched at run time:
+    t       - the tape's buffer
+    p       - the data pointer
+    size    - the tape's size (when p moves past it, the tape grows)
+    write   - callable that outputs a cell's value
+    read    - callable that receives the current cell's value and returns its new value (the next input byte),
+              or None when there is no input yet (then 'suspend' stops the run before the ',')
+    intrinsic - callable that runs an intrinsic at p, and returns the new p, or None when the fragment should run instead
+
+Steps are counted the same way as in the "ir" engine: every straight piece of code adds its length to 'steps' once,
+and at the end of every loop iteration that jumps back the budget is checked (by calling 'checkpoint' once 'steps' reaches 'next_check')
+A run that runs out of budget is stopped after that loop's CLOSE instruction (at the start of its body)
+A run that was stopped in the middle (by either engine) is continued by a function that is generated for that instruction:
+it finishes the current iteration of every loop that contains the instruction (from the innermost one outwards)
+and runs the rest of each loop as a 'while t[p]:' block, so it runs generated code too
+"""
+
+# CPython refuses to compile more than 20 statically nested blocks
+# so loops that are nested deeper than this are moved into functions of their own
+MAX_NESTING_DEPTH = 16
+
+PARAMETERS = "t, p, size, steps, next_check, ensure, scan, write, read, checkpoint, suspend, intrinsic"
+RETURN_VALUES = "t, p, size, steps, next_check"
+
+
+class Suspend(Exception):
+    # raised by checkpoint() to stop the generated code
+    def __init__(self, instruction_pointer, data_pointer, steps, status):
+        Exception.__init__(self, status)
+        self.instruction_pointer = instruction_pointer
+        self.data_pointer = data_pointer
+        self.steps = steps
+        self.status = status
+
+
+def get_pointer_check_code(offset, direction):
+    # returns a line that makes sure that the cell at p+offset exists (direction is the sign of the last move, 0 if unknown)
+    cell = "p + %d" % offset if offset != 0 else "p"
+    if direction > 0:
+        return "if %s >= size: t = ensure(%s); size = len(t)" % (cell, cell)
+    elif direction < 0:
+        return "if %s < 0: ensure(%s)" % (cell, cell)  # raises an error
+    else:
+        return "if %s < 0 or %s >= size: t = ensure(%s); size = len(t)" % (cell, cell, cell)
+
+
+def get_enclosing_loops(code, index):
+    # returns the (OPEN index, CLOSE index) of every loop that contains the instruction at index (or ends with it), from the innermost
+    loops = []
+    for open_index in range(index - 1, -1, -1):
+        command, argument, _ = code[open_index]
+        if command == OPEN and argument >= index:
+            loops.append((open_index, argument))
+    return loops
+
+
+def generate_source(code, start=0):
+    """
+    :param code: list of (opcode, argument, offset) instructions
+    :param start: the instruction to start from (the instruction pointer of a state that was stopped in the middle)
+    :return: Python source code that defines the function "run(<PARAMETERS>)"
+             which executes the instructions from start and returns the updated <RETURN_VALUES>
+    """
+    functions = []
+
+    def generate_function(name, start, end):
+        lines = ["def %s(%s):" % (name, PARAMETERS)]
+        pending_steps = generate_block(lines, start, end, 1)
+        if pending_steps > 0:
+            lines.append("    steps += %d" % pending_steps)
+        lines.append("    return %s" % RETURN_VALUES)
+        functions.append("\n".join(lines))
+
+    def generate_loop(lines, open_index, close_index, depth):
+        # adds the 'while t[p]:' block of a loop (its OPEN was counted already)
+        indent = "    " * depth
+        lines.append(indent + "while t[p]:")
+        generate_iteration_end(lines, generate_block(lines, open_index + 1, close_index, depth + 1), close_index, depth + 1)
+
+    def generate_iteration_end(lines, pending_steps, close_index, depth):
+        # adds the end of a loop's iteration: counts the rest of it (and the CLOSE, which is executed at the end of every iteration)
+        # and checks the budget if the CLOSE jumps back (like Executor.execute)
+        indent = "    " * depth
+        lines.append(indent + "steps += %d" % (pending_steps + 1))
+        lines.append(indent + "if t[p] and steps >= next_check: next_check = checkpoint(p, steps, %d)" % close_index)
+
+    def generate_block(lines, start, end, depth):
+        # returns the amount of steps at the end of the block that were not added to 'steps' yet
+        indent = "    " * depth
+        pending_steps = 0
+        checked = [0, 0]  # the cells from p+checked[0] to p+checked[1] are known to exist (reset whenever p changes)
+
+        def get_cell(offset):
+            # returns the expression of the cell at p+offset, and adds the line that makes sure it exists (unless it is known to exist)
+            if offset < checked[0] or offset > checked[1]:
+                lines.append(indent + get_pointer_check_code(offset, offset))
+                checked[0], checked[1] = min(checked[0], offset), max(checked[1], offset)
+            return "t[p + %d]" % offset if offset != 0 else "t[p]"
+
+        index = start
+        while index < end:
+            command, argument, offset = code[index]
+            pending_steps += 1
+
+            if command == ADD:
+                cell = get_cell(offset)
+                lines.append(indent + "%s = (%s + %d) %% 256" % (cell, cell, argument))
+            elif command == MOVE:
+                lines.append(indent + "p += %d" % argument)
+                lines.append(indent + get_pointer_check_code(0, argument))
+                checked[:] = [0, 0]
+            elif command == CLEAR:
+                lines.append(indent + "%s = 0" % get_cell(offset))
+            elif command == MUL:
+                lines.append(indent + "if t[p]:")
+                if offset < checked[0] or offset > checked[1]:
+                    lines.append(indent + "    " + get_pointer_check_code(offset, offset))
+                lines.append(indent + "    t[p + %d] = (t[p + %d] + %d * t[p]) %% 256" % (offset, offset, argument))
+            elif command == SCAN:
+                lines.append(indent + "p = scan(t, p, %d)" % argument)
+                lines.append(indent + get_pointer_check_code(0, 0))
+                checked[:] = [0, 0]
+            elif command == OUT:
+                lines.append(indent + "write(%s)" % get_cell(offset))
+            elif command == IN:
+                cell = get_cell(offset)
+                lines.append(indent + "v = read(%s)" % cell)
+                lines.append(indent + "if v is None: suspend(p, steps + %d, %d)" % (pending_steps - 1, index))  # there is no input yet
+                lines.append(indent + "%s = v" % cell)
+            elif command == OPEN:
+                close_index = argument
+                if depth >= MAX_NESTING_DEPTH:
+                    # move the whole loop to a function of its own (it counts the OPEN by itself)
+                    pending_steps -= 1
+                    if pending_steps > 0:
+                        lines.append(indent + "steps += %d" % pending_steps)
+                    name = "loop_%d" % index
+                    generate_function(name, index, close_index + 1)
+                    lines.append(indent + "%s = %s(%s)" % (RETURN_VALUES, name, PARAMETERS))
+                else:
+                    lines.append(indent + "steps += %d" % pending_steps)  # everything up to (and including) the OPEN
+                    generate_loop(lines, index, close_index, depth)
+                pending_steps = 0
+                checked[:] = [0, 0]  # p is whatever it was when the loop ended
+                index = close_index  # skip the loop (its CLOSE is handled by the while)
+            elif command == INTRINSIC and depth < MAX_NESTING_DEPTH:  # (deeper fragments just run)
+                fragment_end = argument
+                lines.append(indent + "steps += %d" % pending_steps)  # everything up to (and including) the INTRINSIC
+                lines.append(indent + "v = intrinsic(%d, p)" % offset)
+                lines.append(indent + "if v is not None:")
+                lines.append(indent + "    p = v; size = len(t)")  # (the tape may have grown)
+                if fragment_end > index + 1:
+                    lines.append(indent + "else:")
+                    fragment_steps = generate_block(lines, index + 1, fragment_end, depth + 1)
+                    lines.append(indent + "    steps += %d" % fragment_steps)
+                pending_steps = 0
+                checked[:] = [0, 0]
+                index = fragment_end - 1  # skip the fragment
+
+            index += 1
+
+        return pending_steps
+
+    if start == 0:
+        generate_function("run", 0, len(code))
+    else:
+        # finish the loops that contain start, and then run the rest of the program
+        lines = ["def run(%s):" % PARAMETERS]
+        for open_index, close_index in get_enclosing_loops(code, start):
+            generate_iteration_end(lines, generate_block(lines, start, close_index, 1), close_index, 1)
+            generate_loop(lines, open_index, close_index, 1)
+            start = close_index + 1
+        pending_steps = generate_block(lines, start, len(code), 1)
+        if pending_steps > 0:
+            lines.append("    steps += %d" % pending_steps)
+        lines.append("    return %s" % RETURN_VALUES)
+        functions.append("\n".join(lines))
+    return "\n\n".join(functions) + "\n"
+
+
+def compile_code(code, start=0):
+    # returns the generated "run" function for the instructions (that starts from the instruction at start)
+    namespace = dict()
+    exec(compile(generate_source(code, start), "<brainfuck jit>", "exec"), namespace)
+    return namespace["run"]
+
+
+def execute(code, state, write, read, budget=None, functions=None):
+    """
+    same as Executor.execute, but runs the generated code
+    :param functions: a dict that keeps the compiled functions of the code by the instruction they start from,
+                      so a program that is run a slice at a time is compiled once for every place it stops at
+    """
+    if functions is None:
+        functions = dict()
+    if budget is None:
+        budget = Executor.Budget()
+
+    def checkpoint(data_pointer, steps, close_index):
+        # called at the end of a loop iteration that jumps back (after its CLOSE was counted). returns the next time to call it
+        status = budget.get_stop_reason(steps)
+        if status is not None:
+            raise Suspend(code[close_index][1] + 1, data_pointer, steps, status)  # continue from the start of the loop's body
+        return budget.get_next_check(steps)
+
+    def suspend(data_pointer, steps, in_index):
+        raise Suspend(in_index, data_pointer, steps, Executor.NEEDS_INPUT)
+
+    def intrinsic(number, data_pointer):
+        return INTRINSIC_FUNCTIONS[number](tape, data_pointer, write)
+
+    tape = state.tape
+    run = functions.get(state.instruction_pointer)
+    if run is None:
+        run = functions[state.instruction_pointer] = compile_code(code, state.instruction_pointer)
+    state.status = Executor.RUNNING
+    try:
+        _, data_pointer, _, steps, _ = run(tape.data, state.data_pointer, len(tape.data), state.steps, budget.get_next_check(state.steps),
+                                           tape.ensure, scan, write, read, checkpoint, suspend, intrinsic)
+    except Suspend as suspend:
+        state.instruction_pointer, state.data_pointer, state.steps = suspend.instruction_pointer, suspend.data_pointer, suspend.steps
+        state.status = suspend.status
+        return state
+
+    state.instruction_pointer, state.data_pointer, state.steps = len(code), data_pointer, steps
+    state.status = Executor.HALTED
+    return state
@@ -0,0 +1,203 @@
+from Runtime.Optimizer import ADD, MOVE, OUT, IN, OPEN, CLOSE, CLEAR, MUL, SCAN, INTRINSIC, optimize
+from Runtime.Intrinsics import FUNCTIONS as INTRINSIC_FUNCTIONS
+from Runtime.Tape import DEFAULT_TAPE_SIZE
+from Runtime.Streams import EOF_POLICIES
+from Runtime import Executor
+
+"""
+This file implements the "lanes" batch engine - it runs one program over many inputs at once, using NumPy
+(NumPy is only needed for this engine: pip install numpy)
+
+Every input runs in a lane of its own: a row of a 2-D uint8 array of tapes, with its own data pointer and instruction pointer
+At every step, the instruction with the lowest instruction pointer (among the lanes that did not stop) is executed
+by all the lanes that are at it, as one vectorized update. Lanes that took a different way (e.g stayed in a loop longer)
+wait until the others reach them again, which happens at the end of the loop, since the lowest instruction always runs first
+So lanes that run the same code together pay the interpretation overhead once for all of them
+Intrinsics run lane by lane (on a LaneTape, a view of the lane's row), so the steps are counted the same way as in the "ir" engine
+"""
+
+ERROR = "error"  # the status of a lane that failed (e.g moved left of cell 0). its LaneResult holds the message
+
+
+class LaneResult:
+    def __init__(self, output, status, steps, error=None):
+        self.output = output  # bytes
+        self.status = status  # Executor.HALTED, Executor.STEP_LIMIT or ERROR
+        self.steps = steps
+        self.error = error
+
+
+class LaneTape:
+    # the tape of one lane, with the interface of Runtime.Tape.Tape that the intrinsics use (data, max_size and ensure)
+    def __init__(self, lanes, lane):
+        self.lanes = lanes
+        self.lane = lane
+        self.max_size = lanes.max_tape
+        self.data = memoryview(lanes.tapes[lane])
+
+    def ensure(self, data_pointer):
+        # the intrinsics never ask for cells out of the tape (see Runtime.Intrinsics.get_cells), so this only grows the tapes
+        self.lanes.grow(data_pointer + 1)
+        self.data = memoryview(self.lanes.tapes[self.lane])  # (growing replaces the array)
+        return self.data
+
+
+class Lanes:
+    def __init__(self, np, code, inputs, eof, tape_size, max_tape, max_steps):
+        self.np = np
+        self.code = code
+        self.count = len(inputs)
+
+        self.tapes = np.zeros((self.count, min(tape_size, max_tape) if max_tape is not None else tape_size), dtype=np.uint8)
+        self.max_tape = max_tape
+        self.data_pointers = np.zeros(self.count, dtype=np.int64)
+        self.instruction_pointers = np.zeros(self.count, dtype=np.int64)
+        self.steps = np.zeros(self.count, dtype=np.int64)
+        self.running = np.ones(self.count, dtype=bool)
+        self.max_steps = max_steps
+
+        self.inputs = [bytes(data) for data in inputs]
+        self.input_positions = [0] * self.count
+        self.eof = eof
+        self.outputs = [bytearray() for _ in range(self.count)]
+        self.statuses = [Executor.RUNNING] * self.count
+        self.errors = [None] * self.count
+
+    def stop(self, lanes, status, errors=None):
+        for index, lane in enumerate(lanes.tolist()):
+            self.statuses[lane] = status
+            if errors is not None:
+                self.errors[lane] = errors[index]
+        self.running[lanes] = False
+
+    def get_cells(self, lanes, cells):
+        """
+        makes sure that every lane's cell exists, growing all the tapes if necessary
+        lanes whose cell is out of the tape are stopped with an error
+        :return: the lanes (and their cells) that can continue
+        """
+        bad = cells < 0
+        if self.max_tape is not None:
+            bad |= cells >= self.max_tape
+        if bad.any():
+            self.stop(lanes[bad], ERROR, ["Brainfuck: data pointer moved left of cell 0 (to cell %s)" % cell if cell < 0 else
+                                          "Brainfuck: data pointer moved past the end of the tape (to cell %s, the tape is limited to %s cells)" % (cell, self.max_tape)
+                                          for cell in cells[bad].tolist()])
+            lanes, cells = lanes[~bad], cells[~bad]
+
+        if len(cells) > 0:
+            self.grow(int(cells.max()) + 1)
+        return lanes, cells
+
+    def grow(self, needed):
+        # makes sure that all the tapes have at least <needed> cells (up to max_tape)
+        np = self.np
+        size = self.tapes.shape[1]
+        if needed > size:
+            new_size = size
+            while new_size < needed:
+                new_size *= 2
+            if self.max_tape is not None:
+                new_size = min(new_size, self.max_tape)
+            self.tapes = np.concatenate([self.tapes, np.zeros((self.count, new_size - size), dtype=np.uint8)], axis=1)
+
+    def step(self, lanes, instruction_pointer):
+        # executes the instruction at instruction_pointer in all the lanes (that are at it)
+        np = self.np
+        command, argument, offset = self.code[instruction_pointer]
+        self.steps[lanes] += 1
+        next_instruction = instruction_pointer + 1
+
+        if command == ADD:
+            lanes, cells = self.get_cells(lanes, self.data_pointers[lanes] + offset)
+            self.tapes[lanes, cells] += np.uint8(argument)
+        elif command == MOVE:
+            lanes, cells = self.get_cells(lanes, self.data_pointers[lanes] + argument)
+            self.data_pointers[lanes] = cells
+        elif command == CLEAR:
+            lanes, cells = self.get_cells(lanes, self.data_pointers[lanes] + offset)
+            self.tapes[lanes, cells] = 0
+        elif command == MUL:
+            multiplying = lanes[self.tapes[lanes, self.data_pointers[lanes]] != 0]
+            multiplying, cells = self.get_cells(multiplying, self.data_pointers[multiplying] + offset)
+            values = self.tapes[multiplying, self.data_pointers[multiplying]].astype(np.uint16)
+            self.tapes[multiplying, cells] += (values * argument % 256).astype(np.uint8)
+        elif command == SCAN:
+            searching = lanes
+            while len(searching) > 0:
+                searching = searching[self.tapes[searching, self.data_pointers[searching]] != 0]
+                searching, cells = self.get_cells(searching, self.data_pointers[searching] + argument)
+                self.data_pointers[searching] = cells
+        elif command == OUT:
+            lanes, cells = self.get_cells(lanes, self.data_pointers[lanes] + offset)
+            for lane, value in zip(lanes.tolist(), self.tapes[lanes, cells].tolist()):
+                self.outputs[lane].append(value)
+        elif command == IN:
+            lanes, cells = self.get_cells(lanes, self.data_pointers[lanes] + offset)
+            for lane, cell in zip(lanes.tolist(), cells.tolist()):
+                position = self.input_positions[lane]
+                if position < len(self.inputs[lane]):
+                    self.tapes[lane, cell] = self.inputs[lane][position]
+                    self.input_positions[lane] = position + 1
+                elif self.eof != "unchanged":
+                    self.tapes[lane, cell] = int(self.eof)
+        elif command == OPEN:
+            jump = self.tapes[lanes, self.data_pointers[lanes]] == 0
+            self.instruction_pointers[lanes[jump]] = argument + 1
+            lanes = lanes[~jump]
+        elif command == CLOSE:
+            jump = self.tapes[lanes, self.data_pointers[lanes]] != 0
+            jumping = lanes[jump]
+            self.instruction_pointers[jumping] = argument + 1
+            if self.max_steps is not None:  # back-edge: check the budget
+                self.stop(jumping[self.steps[jumping] >= self.max_steps], Executor.STEP_LIMIT)
+            lanes = lanes[~jump]
+        elif command == INTRINSIC:
+            skip = np.zeros(len(lanes), dtype=bool)  # the lanes whose intrinsic ran (the others run the fragment)
+            for index, lane in enumerate(lanes.tolist()):
+                new_data_pointer = INTRINSIC_FUNCTIONS[offset](LaneTape(self, lane), int(self.data_pointers[lane]), self.outputs[lane].append)
+                if new_data_pointer is not None:
+                    self.data_pointers[lane] = new_data_pointer
+                    skip[index] = True
+            self.instruction_pointers[lanes[skip]] = argument
+            lanes = lanes[~skip]
+
+        self.instruction_pointers[lanes] = next_instruction  # (lanes that were stopped are not run again, whatever their instruction pointer is)
+
+    def run(self):
+        np = self.np
+        code_length = len(self.code)
+        lane_numbers = np.arange(self.count)
+
+        while True:
+            active = lane_numbers[self.running]
+            if len(active) == 0:
+                break
+            instruction_pointers = self.instruction_pointers[active]
+            instruction_pointer = int(instruction_pointers.min())
+            if instruction_pointer >= code_length:  # every lane that is still running reached the end
+                self.stop(active, Executor.HALTED)
+                break
+            self.step(active[instruction_pointers == instruction_pointer], instruction_pointer)
+
+        return [LaneResult(bytes(self.outputs[lane]), self.statuses[lane], int(self.steps[lane]), self.errors[lane]) for lane in range(self.count)]
+
+
+def run(program, inputs, eof="unchanged", tape_size=DEFAULT_TAPE_SIZE, max_tape=None, max_steps=None, intrinsics=False):
+    """
+    runs the program over every input
+    :param program: Brainfuck code (string)
+    :param inputs: list of inputs (bytes), one for every lane
+    :param eof: what ',' does at the end of the input, one of EOF_POLICIES
+    :param max_steps: stop a lane after it executed this amount of (optimized) instructions (None means no limit)
+    :param intrinsics: run the hinted fragments natively, as in Interpreter.brainfuck()
+    :return: list of LaneResult, one for every input
+    """
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("The lanes engine needs NumPy (pip install numpy)")
+    if eof not in EOF_POLICIES:
+        raise ValueError("Unknown EOF policy '%s' (expected one of: %s)" % (eof, ", ".join(EOF_POLICIES)))
+
+    return Lanes(numpy, optimize(program, intrinsics=intrinsics), inputs, eof, tape_size, max_tape, max_steps).run()
@@ -0,0 +1,238 @@
+import hashlib
+import os
+import subprocess
+import sys
+from Runtime.Optimizer import ADD, MOVE, OUT, IN, OPEN, CLOSE, CLEAR, MUL, SCAN, OPTIMIZER_VERSION
+from Runtime.Tape import BFRuntimeError
+from Runtime.Cache import get_cache_directory
+
+"""
+This file implements the "native" engine
+It translates the IR into a standalone C program, builds it with the system's C compiler, and runs it
+
+The C program reads its input from the standard input and writes its output to the standard output
+Its settings are given as arguments: <eof policy> <tape size> <max tape (0 means no limit)> <output buffer mode>
+Errors (the data pointer moving out of the tape) are printed to the standard error, with the exit code 1
+
+Built programs are kept in the cache directory (see Runtime/Cache.py), named after the hash of their C source
+"""
+
+C_EMITTER_VERSION = 1  # changes whenever generate_c_source() changes
+CC = os.environ.get("CC", "cc")
+CFLAGS = ["-O2"]
+
+C_PRELUDE = r"""#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+static unsigned char *t;
+static long size, max_size;
+static int eof_value;  /* -1 means the cell is left unchanged */
+
+static void left_error(long cell) {
+    fflush(stdout);
+    fprintf(stderr, "Brainfuck: data pointer moved left of cell 0 (to cell %ld)\n", cell);
+    exit(1);
+}
+
+static void grow(long cell) {
+    long new_size = size;
+    if (max_size != 0 && cell >= max_size) {
+        fflush(stdout);
+        fprintf(stderr, "Brainfuck: data pointer moved past the end of the tape (to cell %ld, the tape is limited to %ld cells)\n", cell, max_size);
+        exit(1);
+    }
+    while (new_size <= cell)
+        new_size *= 2;
+    if (max_size != 0 && new_size > max_size)
+        new_size = max_size;
+    t = realloc(t, new_size);
+    if (t == NULL) {
+        fprintf(stderr, "Brainfuck: out of memory\n");
+        exit(1);
+    }
+    memset(t + size, 0, new_size - size);
+    size = new_size;
+}
+
+static long scan(long p, long stride) {
+    if (stride == 1) {
+        unsigned char *zero = memchr(t + p, 0, size - p);
+        p = zero != NULL ? zero - t : size;
+    }
+    else {
+        while (p >= 0 && p < size && t[p])
+            p += stride;
+    }
+    if (p < 0) left_error(p);
+    if (p >= size) grow(p);
+    return p;
+}
+
+static void in(long cell) {
+    int c;
+    fflush(stdout);  /* show everything (e.g a prompt) before reading input */
+    c = getchar();
+    if (c != EOF)
+        t[cell] = (unsigned char)c;
+    else if (eof_value >= 0)
+        t[cell] = (unsigned char)eof_value;
+}
+
+static void run(void) {
+    long p = 0;
+"""
+
+C_MAIN = r"""}
+
+int main(int argc, char **argv) {
+    const char *eof = argc > 1 ? argv[1] : "unchanged";
+    const char *mode = argc > 4 ? argv[4] : "line";
+    eof_value = strcmp(eof, "unchanged") == 0 ? -1 : atoi(eof);
+    size = argc > 2 ? atol(argv[2]) : 30000;
+    max_size = argc > 3 ? atol(argv[3]) : 0;
+    if (max_size != 0 && size > max_size)
+        size = max_size;
+
+    if (strcmp(mode, "none") == 0)
+        setvbuf(stdout, NULL, _IONBF, 0);
+    else if (strcmp(mode, "line") == 0)
+        setvbuf(stdout, NULL, _IOLBF, 8192);
+    else
+        setvbuf(stdout, NULL, _IOFBF, 8192);
+
+    t = calloc(size, 1);
+    if (t == NULL) {
+        fprintf(stderr, "Brainfuck: out of memory\n");
+        return 1;
+    }
+    run();
+    fflush(stdout);
+    return 0;
+}
+"""
+
+
+def get_pointer_check_code(offset, direction):
+    # returns a statement that makes sure that the cell at p+offset exists (direction is the sign of the last move, 0 if unknown)
+    cell = "p + %d" % offset if offset != 0 else "p"
+    if direction > 0:
+        return "if (%s >= size) grow(%s);" % (cell, cell)
+    elif direction < 0:
+        return "if (%s < 0) left_error(%s);" % (cell, cell)
+    else:
+        return "if (%s < 0) left_error(%s); if (%s >= size) grow(%s);" % (cell, cell, cell, cell)
+
+
+def generate_c_source(code):
+    """
+    :param code: list of (opcode, argument, offset) instructions
+    :return: the source code of a standalone C program that executes the instructions
+    """
+    lines = []
+    depth = 1
+    checked = [0, 0]  # the cells from p+checked[0] to p+checked[1] are known to exist (reset whenever p changes)
+
+    def get_cell(offset):
+        # returns the index of the cell at p+offset, and adds the line that makes sure it exists (unless it is known to exist)
+        if offset < checked[0] or offset > checked[1]:
+            lines.append("    " * depth + get_pointer_check_code(offset, offset))
+            checked[0], checked[1] = min(checked[0], offset), max(checked[1], offset)
+        return "p + %d" % offset if offset != 0 else "p"
+
+    for command, argument, offset in code:
+        indent = "    " * depth
+
+        if command == ADD:
+            lines.append(indent + "t[%s] += %d;" % (get_cell(offset), argument))
+        elif command == MOVE:
+            lines.append(indent + "p += %d;" % argument)
+            lines.append(indent + get_pointer_check_code(0, argument))
+            checked[:] = [0, 0]
+        elif command == CLEAR:
+            lines.append(indent + "t[%s] = 0;" % get_cell(offset))
+        elif command == MUL:
+            lines.append(indent + "if (t[p]) {")
+            lines.append(indent + "    " + get_pointer_check_code(offset, offset))
+            lines.append(indent + "    t[p + %d] += %d * t[p];" % (offset, argument))
+            lines.append(indent + "}")
+        elif command == SCAN:
+            lines.append(indent + "p = scan(p, %d);" % argument)
+            checked[:] = [0, 0]
+        elif command == OUT:
+            lines.append(indent + "putchar(t[%s]);" % get_cell(offset))
+        elif command == IN:
+            lines.append(indent + "in(%s);" % get_cell(offset))
+        elif command == OPEN:
+            lines.append(indent + "while (t[p]) {")
+            depth += 1
+            checked[:] = [0, 0]
+        elif command == CLOSE:
+            depth -= 1
+            lines.append("    " * depth + "}")
+            checked[:] = [0, 0]  # p is whatever it was when the loop ended
+        # INTRINSIC is left out: the C compiler makes the fragment itself fast enough
+
+    return C_PRELUDE + "\n".join(lines) + "\n" + C_MAIN
+
+
+def build(code):
+    """
+    builds the C program of the instructions (unless it is already in the cache)
+    :return: the path of the executable
+    raises BFRuntimeError if the C compiler fails
+    """
+    source = generate_c_source(code)
+    digest = hashlib.sha256(("%s %s %s\n" % (CC, " ".join(CFLAGS), C_EMITTER_VERSION) + source).encode("utf8")).hexdigest()
+    directory = get_cache_directory()
+    executable_path = os.path.join(directory, "%s-v%d%s" % (digest, OPTIMIZER_VERSION, ".exe" if sys.platform == "win32" else ""))
+    if os.path.exists(executable_path):
+        return executable_path
+
+    os.makedirs(directory, exist_ok=True)
+    source_path = "%s.%d.c" % (executable_path, os.getpid())
+    temporary_path = "%s.%d.tmp" % (executable_path, os.getpid())  # other processes may build the same program at the same time
+    with open(source_path, "wt") as f:
+        f.write(source)
+    try:
+        result = subprocess.run([CC] + CFLAGS + ["-o", temporary_path, source_path], capture_output=True, text=True)
+    except OSError as e:
+        raise BFRuntimeError("Brainfuck: could not run the C compiler '%s' (%s)" % (CC, e))
+    finally:
+        os.remove(source_path)
+    if result.returncode != 0:
+        raise BFRuntimeError("Brainfuck: the C compiler failed:\n%s" % result.stderr)
+
+    os.replace(temporary_path, executable_path)
+    return executable_path
+
+
+def execute(code, output=None, input_bytes=None, eof="unchanged", tape_size=30000, max_tape=None, output_buffer="line", timeout=None):
+    """
+    builds and runs the instructions
+    :param output: a sink that receives the output (then it is collected and written when the program ends),
+                   or None to let the program write to the standard output itself
+    :param input_bytes: the whole input, or None to let the program read the standard input itself
+    :return: True if the program halted, False if it was stopped after timeout seconds
+    raises BFRuntimeError if the program failed
+    """
+    executable_path = build(code)
+    arguments = [executable_path, eof, str(tape_size), str(max_tape or 0), output_buffer]
+    if output is None:
+        sys.stdout.flush()
+
+    timed_out = False
+    try:
+        result = subprocess.run(arguments, input=input_bytes, stdout=subprocess.PIPE if output is not None else None,
+                                stderr=subprocess.PIPE, timeout=timeout)
+        stdout, stderr, returncode = result.stdout, result.stderr, result.returncode
+    except subprocess.TimeoutExpired as e:
+        stdout, stderr, returncode = e.stdout, e.stderr, 0
+        timed_out = True
+
+    if output is not None:
+        for value in stdout or b"":
+            output.write(value)
+    if returncode != 0:
+        raise BFRuntimeError((stderr or b"").decode("utf8", "replace").strip() or "Brainfuck: the native program failed (exit code %s)" % returncode)
+    return not timed_out
@@ -0,0 +1,239 @@
+"""
+This file turns Brainfuck code into a compact list of instructions (IR) that is cheaper to execute than the raw text
+Each instruction is a tuple of (opcode, argument, offset)
+
+Comments are dropped, runs of +/- are folded into a single ADD, runs of >/< are folded into a single MOVE,
+and the jump targets of loops are resolved ahead of time and stored inside the OPEN/CLOSE instructions
+
+Loops that match one of the common idioms the compiler emits are replaced by a single instruction (or a few):
+    [-] or [+]                  --> CLEAR
+    [>] or [<<] etc.            --> SCAN
+    [->+<] or [->+>++<<] etc.   --> MUL for each target cell, followed by CLEAR
+
+Finally, the moves inside every straight piece of code are removed: ADD, CLEAR, OUT and IN work on the cell at <offset>
+from the data pointer instead, and the data pointer is moved once, before the next instruction that needs it
+    <<<<<[-]>>>>>+  --> CLEAR at -5, ADD 1 at 0 (instead of MOVE, CLEAR, MOVE, ADD)
+
+Fragments that the compiler wrapped in intrinsic hints get an INTRINSIC instruction before them (see Runtime/Intrinsics.py),
+but only when optimize() is asked to follow hints (otherwise a hint is a comment, like in any other Brainfuck interpreter)
+Nothing is folded across the edges of a fragment, so the fragment can be skipped as a whole
+"""
+
+from array import array
+from Runtime.Intrinsics import get_hints
+
+OPTIMIZER_VERSION = 3  # changes whenever the instructions that optimize() returns for the same program change
+
+ADD = 0  # add <argument> to the cell at <offset> (argument is already reduced mod 256)
+MOVE = 1  # move the data pointer <argument> cells (negative means left)
+OUT = 2  # output the cell at <offset>
+IN = 3  # read one byte of input into the cell at <offset>
+OPEN = 4  # if the current cell is 0, jump to <argument> (the index of the matching CLOSE)
+CLOSE = 5  # if the current cell is not 0, jump to <argument> (the index of the matching OPEN)
+CLEAR = 6  # set the cell at <offset> to 0
+MUL = 7  # add <argument> times the current cell to the cell at <offset> from the current cell (mod 256)
+SCAN = 8  # move the data pointer <argument> cells at a time until it points to a cell that is 0
+INTRINSIC = 9  # run intrinsic number <offset> and jump to <argument> (the index of the instruction after its fragment), or run the fragment
+
+
+def get_location(program, index):
+    # returns the (line, column) of the character at index, humans count from 1 :)
+    line_start = program.rfind('\n', 0, index) + 1
+    return program.count('\n', 0, index) + 1, index - line_start + 1
+
+
+def create_jump_table(program):
+    """
+    returns an array that holds, for every bracket in the program, the index of its matching bracket (and -1 for every other character)
+    raises SyntaxError with the location of the first unmatched bracket
+    """
+    jumps = array('i', [-1]) * len(program)
+    lbraces = list()
+
+    for index, command in enumerate(program):
+        if command == '[':
+            lbraces.append(index)
+        elif command == ']':
+            if len(lbraces) == 0:
+                raise SyntaxError("Brainfuck: unmatched ']' (line %s column %s)" % get_location(program, index))
+
+            lbrace_index = lbraces.pop()
+            jumps[lbrace_index] = index
+            jumps[index] = lbrace_index
+
+    if len(lbraces) != 0:
+        raise SyntaxError("Brainfuck: unmatched '[' (line %s column %s)" % get_location(program, lbraces[-1]))
+
+    return jumps
+
+
+def get_loop_idiom_code(body):
+    """
+    :param body: the instructions of an innermost loop (without its OPEN and CLOSE)
+    :return: list of instructions that do the same as the loop, or None if the loop is not an idiom we know
+    """
+    if len(body) == 1 and body[0][0] == ADD and body[0][1] in (1, 255):
+        return [(CLEAR, 0, 0)]  # [-] or [+]
+
+    if len(body) == 1 and body[0][0] == MOVE:
+        return [(SCAN, body[0][1], 0)]  # [>] or [<] (or longer strides)
+
+    # multiply loop: only ADDs and MOVEs, returns to where it started, and changes the loop cell by exactly 1
+    offset = 0
+    deltas = dict()  # offset --> total amount added to that cell in one iteration
+    for command, argument, _ in body:
+        if command == ADD:
+            deltas[offset] = (deltas.get(offset, 0) + argument) % 256
+        elif command == MOVE:
+            offset += argument
+        else:
+            return None
+
+    if offset != 0 or deltas.get(0) not in (1, 255):
+        return None
+
+    # the loop runs <cell> times for [-...] and <256 - cell> times for [+...], which is -cell (mod 256)
+    sign = 1 if deltas[0] == 255 else -1
+    code = [(MUL, (sign * delta) % 256, target) for target, delta in deltas.items() if target != 0 and delta != 0]
+    code.append((CLEAR, 0, 0))
+    return code
+
+
+def optimize(program, positions=None, intrinsics=False):
+    """
+    :param program: Brainfuck code (string)
+    :param positions: if a list is given, it is filled with the index (in program) of the first character of every instruction
+    :param intrinsics: run the fragments in intrinsic hints ({<name>:...}) natively. off by default, since in standard Brainfuck they are comments
+    :return: list of (opcode, argument, offset) instructions
+    """
+    jumps = create_jump_table(program)
+    open_instructions = dict()  # index of '[' in the program --> index of its OPEN instruction
+    hints = get_hints(program) if intrinsics else dict()
+    hint_ends = dict()  # index of a hint's '}' in the program --> index of its INTRINSIC instruction
+    barrier = 0  # the instructions before this index end a fragment, so the next ones are not folded into them
+    if positions is None:
+        positions = []
+
+    code = []
+    for index, command in enumerate(program):
+        if command == '+' or command == '-':
+            amount, position = (1 if command == '+' else -1), index
+            if len(code) > barrier and code[-1][0] == ADD:
+                amount += code.pop()[1]
+                position = positions.pop()
+            if amount % 256 != 0:
+                code.append((ADD, amount % 256, 0))
+                positions.append(position)
+
+        elif command == '>' or command == '<':
+            amount, position = (1 if command == '>' else -1), index
+            if len(code) > barrier and code[-1][0] == MOVE:
+                amount += code.pop()[1]
+                position = positions.pop()
+            if amount != 0:
+                code.append((MOVE, amount, 0))
+                positions.append(position)
+
+        elif command == '.':
+            code.append((OUT, 0, 0))
+            positions.append(index)
+
+        elif command == ',':
+            code.append((IN, 0, 0))
+            positions.append(index)
+
+        elif command == '[':
+            open_instructions[index] = len(code)
+            code.append((OPEN, None, 0))  # target is filled when we reach the matching CLOSE
+            positions.append(index)
+
+        elif command == ']':
+            open_index = open_instructions[jumps[index]]
+            idiom_code = get_loop_idiom_code(code[open_index + 1:])
+            if idiom_code is not None:
+                del code[open_index:]
+                del positions[open_index + 1:]  # the idiom's instructions are located at the loop's '['
+                code.extend(idiom_code)
+                positions.extend([positions[-1]] * (len(idiom_code) - 1))
+            else:
+                code[open_index] = (OPEN, len(code), 0)
+                code.append((CLOSE, open_index, 0))
+                positions.append(index)
+
+        elif command == '{' and index in hints:
+            number, end = hints[index]
+            hint_ends[end] = len(code)
+            code.append((INTRINSIC, None, number))  # target is filled when we reach the end of the hint
+            positions.append(index)
+
+        elif command == '}' and index in hint_ends:
+            intrinsic_index = hint_ends.pop(index)
+            code[intrinsic_index] = (INTRINSIC, len(code), code[intrinsic_index][2])
+            barrier = len(code)
+
+        # everything else is comment
+
+    return fuse_moves(code, positions)
+
+
+def fuse_moves(code, positions):
+    """
+    removes the moves between the instructions that do not need the data pointer itself (ADD, CLEAR, OUT, IN),
+    by giving them the offset of their cell from the data pointer instead
+    the data pointer is moved (once) before every instruction that needs it: loops, MUL, SCAN and INTRINSIC
+    (and at the end, and at the end of every hinted fragment)
+    :param positions: the positions of the instructions, which is replaced by the positions of the returned instructions
+    :return: the new list of instructions
+    """
+    fused_code, fused_positions = [], []
+    open_instructions = []  # indexes (in fused_code) of the OPEN instructions of the loops we are in
+    fragment_ends = dict()  # index (in code) of the instruction after a fragment --> indexes (in fused_code) of the INTRINSIC instructions that skip to it
+    pending_move, move_position = 0, None  # the amount the data pointer should have moved by now, and the position of the first of these moves
+
+    for index, (command, argument, offset) in enumerate(code):
+        if index in fragment_ends:
+            if pending_move != 0:
+                fused_code.append((MOVE, pending_move, 0))
+                fused_positions.append(move_position)
+                pending_move = 0
+            for intrinsic_index in fragment_ends.pop(index):
+                fused_code[intrinsic_index] = (INTRINSIC, len(fused_code), fused_code[intrinsic_index][2])
+
+        if command == MOVE:
+            if pending_move == 0:
+                move_position = positions[index]
+            pending_move += argument
+            continue
+
+        if command in (ADD, CLEAR, OUT, IN):
+            fused_code.append((command, argument, offset + pending_move))
+            fused_positions.append(positions[index])
+            continue
+
+        if pending_move != 0:
+            fused_code.append((MOVE, pending_move, 0))
+            fused_positions.append(move_position)
+            pending_move = 0
+
+        if command == OPEN:
+            open_instructions.append(len(fused_code))
+            fused_code.append((OPEN, None, 0))  # target is filled when we reach the matching CLOSE
+        elif command == CLOSE:
+            open_index = open_instructions.pop()
+            fused_code[open_index] = (OPEN, len(fused_code), 0)
+            fused_code.append((CLOSE, open_index, 0))
+        elif command == INTRINSIC:
+            fragment_ends.setdefault(argument, []).append(len(fused_code))
+            fused_code.append((INTRINSIC, None, offset))  # target is filled when we reach the end of the fragment
+        else:
+            fused_code.append((command, argument, offset))
+        fused_positions.append(positions[index])
+
+    if pending_move != 0:
+        fused_code.append((MOVE, pending_move, 0))
+        fused_positions.append(move_position)
+    for intrinsic_index in fragment_ends.pop(len(code), []):  # fragments that end the program
+        fused_code[intrinsic_index] = (INTRINSIC, len(fused_code), fused_code[intrinsic_index][2])
+
+    positions[:] = fused_positions
+    return fused_code
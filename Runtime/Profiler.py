@@ -0,0 +1,221 @@
+import json
+from Runtime.Optimizer import ADD, MOVE, OUT, IN, OPEN, CLOSE, CLEAR, MUL, SCAN, INTRINSIC, optimize, get_location
+from Runtime.Tape import scan
+from Runtime.Intrinsics import FUNCTIONS as INTRINSIC_FUNCTIONS
+from Runtime import Executor
+
+"""
+This file implements the profiler - a version of the "ir" engine that counts how many times every instruction was executed
+From these counts it finds the loops that take most of the time, and points to their brackets in the Brainfuck code
+
+For every loop (that was not replaced by an idiom instruction) the profile holds:
+    entries     - how many times the loop was entered (its '[' was reached with a non-zero cell)
+    iterations  - how many times its body was executed
+    steps       - the steps executed inside the loop, including its nested loops
+    self steps  - the steps executed inside the loop, excluding its nested loops (this is what the report is sorted by)
+"""
+
+DEFAULT_TOP_LOOPS = 10
+EXCERPT_LENGTH = 40  # amount of Brainfuck characters shown for every loop in the report
+
+
+class Profile:
+    def __init__(self):
+        self.program = None
+        self.intrinsics = False
+        self.code = None
+        self.positions = None  # positions[i] is the index (in program) of instruction i
+        self.counts = None  # counts[i] is the amount of times instruction i was executed
+        self.skips = None  # skips[i] is the amount of times the OPEN instruction i jumped over its loop
+
+    def prepare(self, program, intrinsics=False):
+        """
+        optimizes the program (remembering where every instruction came from) and returns the instructions
+        preparing the same program again (when continuing a stopped run) keeps the counts
+        """
+        if program != self.program or intrinsics != self.intrinsics:
+            self.program, self.intrinsics = program, intrinsics
+            self.positions = []
+            self.code = optimize(program, self.positions, intrinsics)
+            self.counts = [0] * len(self.code)
+            self.skips = [0] * len(self.code)
+        return self.code
+
+    @property
+    def total_steps(self):
+        return sum(self.counts)
+
+    def get_loops(self):
+        # returns a list of dicts that describe every loop, in program order
+        code, counts = self.code, self.counts
+        total_steps = self.total_steps
+
+        cumulative = [0]  # cumulative[i] is the amount of steps of instructions 0..i-1
+        for count in counts:
+            cumulative.append(cumulative[-1] + count)
+
+        loops = []
+        for open_index, (command, close_index, _) in enumerate(code):
+            if command != OPEN:
+                continue
+
+            steps = cumulative[close_index + 1] - cumulative[open_index]
+            self_steps = steps
+            index = open_index + 1
+            while index < close_index:  # subtract the nested loops
+                if code[index][0] == OPEN:
+                    nested_close_index = code[index][1]
+                    self_steps -= cumulative[nested_close_index + 1] - cumulative[index]
+                    index = nested_close_index
+                index += 1
+
+            start, end = self.positions[open_index], self.positions[close_index]
+            loops.append(dict(
+                start=start,
+                end=end,
+                start_location=get_location(self.program, start),
+                end_location=get_location(self.program, end),
+                entries=counts[open_index] - self.skips[open_index],
+                iterations=counts[close_index],
+                steps=steps,
+                self_steps=self_steps,
+                share=steps / total_steps if total_steps > 0 else 0.0,
+                self_share=self_steps / total_steps if total_steps > 0 else 0.0,
+            ))
+
+        return loops
+
+    def get_hot_loops(self, top=DEFAULT_TOP_LOOPS):
+        loops = [loop for loop in self.get_loops() if loop["entries"] > 0]
+        loops.sort(key=lambda loop: loop["self_steps"], reverse=True)
+        return loops[:top]
+
+    def get_excerpt(self, loop):
+        # returns the beginning of the loop's code, without comments
+        commands = []
+        for command in self.program[loop["start"]:loop["end"] + 1]:
+            if command in "+-<>.,[]":
+                commands.append(command)
+                if len(commands) == EXCERPT_LENGTH:
+                    commands.append("...")
+                    break
+        return "".join(commands)
+
+    def get_report(self, top=DEFAULT_TOP_LOOPS):
+        # returns a human readable table of the <top> hottest loops
+        lines = ["Profile: %s steps, %s loops" % (self.total_steps, len([1 for command, _, _ in self.code if command == OPEN])),
+                 "%-5s %-19s %-19s %12s %12s %14s %7s %14s %7s  %s" % ("rank", "[ at line:column", "] at line:column", "entries", "iterations",
+                                                                         "steps", "share", "self steps", "self", "code")]
+        for rank, loop in enumerate(self.get_hot_loops(top), 1):
+            lines.append("%-5d %-19s %-19s %12d %12d %14d %6.2f%% %14d %6.2f%%  %s" % (
+                rank, "%s:%s" % loop["start_location"], "%s:%s" % loop["end_location"], loop["entries"], loop["iterations"],
+                loop["steps"], loop["share"] * 100, loop["self_steps"], loop["self_share"] * 100, self.get_excerpt(loop)))
+        return "\n".join(lines)
+
+    def to_json(self):
+        # returns the whole profile (every loop, and the count of every instruction with its position) for other tools
+        return json.dumps(dict(
+            total_steps=self.total_steps,
+            loops=self.get_loops(),
+            instructions=[dict(position=position, opcode=command, argument=argument, offset=offset, count=count)
+                          for (command, argument, offset), position, count in zip(self.code, self.positions, self.counts)],
+        ))
+
+
+def execute(code, state, write, read, budget, profile):
+    """
+    same as Executor.execute, but counts every executed instruction in the profile
+    """
+    counts, skips = profile.counts, profile.skips
+
+    tape = state.tape
+    data = tape.data
+    size = len(data)
+    data_pointer = state.data_pointer
+    instruction_pointer = state.instruction_pointer
+
+    steps = state.steps
+    next_check = budget.get_next_check(steps)
+    state.status = Executor.RUNNING
+
+    while instruction_pointer < len(code):
+        command, argument, offset = code[instruction_pointer]
+        counts[instruction_pointer] += 1
+        steps += 1
+
+        if command == ADD:
+            target = data_pointer + offset
+            if target < 0 or target >= size:
+                data = tape.ensure(target)
+                size = len(data)
+            data[target] = (data[target] + argument) % 256
+        elif command == MOVE:
+            data_pointer += argument
+            if data_pointer < 0 or data_pointer >= size:
+                data = tape.ensure(data_pointer)
+                size = len(data)
+        elif command == CLEAR:
+            target = data_pointer + offset
+            if target < 0 or target >= size:
+                data = tape.ensure(target)
+                size = len(data)
+            data[target] = 0
+        elif command == MUL:
+            value = data[data_pointer]
+            if value != 0:
+                target = data_pointer + offset
+                if target < 0 or target >= size:
+                    data = tape.ensure(target)
+                    size = len(data)
+                data[target] = (data[target] + argument * value) % 256
+        elif command == SCAN:
+            data_pointer = scan(data, data_pointer, argument)
+            if data_pointer < 0 or data_pointer >= size:
+                data = tape.ensure(data_pointer)
+                size = len(data)
+        elif command == OPEN:
+            if data[data_pointer] == 0:
+                skips[instruction_pointer] += 1
+                instruction_pointer = argument
+        elif command == CLOSE:
+            if data[data_pointer] != 0:
+                instruction_pointer = argument
+
+                if steps >= next_check:  # back-edge: check the budget
+                    status = budget.get_stop_reason(steps)
+                    if status is not None:
+                        state.instruction_pointer, state.data_pointer, state.steps = argument + 1, data_pointer, steps
+                        state.status = status
+                        return state
+                    next_check = budget.get_next_check(steps)
+        elif command == OUT:
+            target = data_pointer + offset
+            if target < 0 or target >= size:
+                data = tape.ensure(target)
+                size = len(data)
+            write(data[target])
+        elif command == IN:
+            target = data_pointer + offset
+            if target < 0 or target >= size:
+                data = tape.ensure(target)
+                size = len(data)
+            value = read(data[target])
+            if value is None:  # stop before the ',', it is executed again when the run continues
+                counts[instruction_pointer] -= 1
+                state.instruction_pointer, state.data_pointer, state.steps = instruction_pointer, data_pointer, steps - 1
+                state.status = Executor.NEEDS_INPUT
+                return state
+            data[target] = value
+        elif command == INTRINSIC:
+            new_data_pointer = INTRINSIC_FUNCTIONS[offset](tape, data_pointer, write)
+            if new_data_pointer is not None:  # skip the fragment (otherwise it runs)
+                data_pointer = new_data_pointer
+                data = tape.data
+                size = len(data)
+                instruction_pointer = argument - 1
+
+        instruction_pointer += 1
+
+    state.instruction_pointer, state.data_pointer, state.steps = len(code), data_pointer, steps
+    state.status = Executor.HALTED
+    return state
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import zlib
+from Runtime.Executor import ExecutionState
+from Runtime.Optimizer import OPTIMIZER_VERSION
+from Runtime.Streams import InputSource, StdinInput, FeedInput
+from Runtime.Tape import Tape
+
+"""
+This file saves the state of a stopped run to a file, and loads it back, so the run can be continued later
+(in another process, or after a restart) without recomputing everything
+
+A snapshot file is made of:
+    MAGIC
+    a header - one line of JSON with the pointers, the step count, the sizes of the parts below,
+               and the hash of the program (a snapshot can only be continued with the program it was taken from,
+               and with the same version of the optimizer, and the same intrinsics setting, since the instruction pointer points into its instructions)
+    the tape - without its trailing zero cells, compressed with zlib
+    the input that was read from the source but not used yet
+    the output that was produced but not written yet
+"""
+
+MAGIC = b"BF-it snapshot 1\n"
+
+
+def get_program_hash(program):
+    return hashlib.sha256(program.encode("utf8")).hexdigest()
+
+
+def get_pending_output(output):
+    # returns the output that the sink holds but did not write yet
+    buffer = getattr(output, "buffer", None)
+    if buffer is None or not hasattr(output, "callback"):  # only OutputSink delays output, other sinks hold it themselves
+        return b""
+    return bytes(buffer)
+
+
+def save(path, program, state, output=None, intrinsics=False):
+    """
+    writes the state (and its input source, and the output that <output> did not write yet) to path
+    the file is replaced atomically, so a crash while saving never leaves a broken snapshot behind
+    :param intrinsics: whether the run follows intrinsic hints (as in Runtime.Optimizer.optimize)
+    """
+    tape = state.tape.data
+    cells = tape[:].rstrip(b"\0")  # (slicing copies memory mappings to bytes, which can be stripped)
+    compressed_tape = zlib.compress(cells)
+
+    input_source = state.input_source
+    pending_input = b""
+    input_header = None
+    if input_source is not None:
+        pending_input = input_source.data[input_source.position:]
+        kind = "stdin" if isinstance(input_source, StdinInput) else "feed" if isinstance(input_source, FeedInput) else "buffer"
+        input_header = dict(kind=kind, eof=input_source.eof, length=len(pending_input),
+                            reached_eof=getattr(input_source, "reached_eof", False), closed=getattr(input_source, "closed", False))
+
+    pending_output = state.pending_output + (get_pending_output(output) if output is not None else b"")
+
+    header = dict(program=get_program_hash(program), optimizer=OPTIMIZER_VERSION, intrinsics=intrinsics, instruction_pointer=state.instruction_pointer, data_pointer=state.data_pointer,
+                  steps=state.steps, tape_size=len(tape), max_tape=state.tape.max_size, tape_length=len(compressed_tape),
+                  input=input_header, output_length=len(pending_output))
+
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(json.dumps(header).encode("utf8") + b"\n")
+        f.write(compressed_tape)
+        f.write(pending_input)
+        f.write(pending_output)
+    os.replace(temporary_path, path)
+
+
+def load(path, program, intrinsics=False):
+    """
+    :return: the ExecutionState that was saved to path, ready to be passed to Interpreter.brainfuck(state=...)
+    raises ValueError if the file is not a snapshot (or a truncated or corrupt one), or was taken from a different program
+    (or with a different intrinsics setting)
+    """
+    with open(path, "rb") as f:
+        content = f.read()
+
+    if not content.startswith(MAGIC):
+        raise ValueError("'%s' is not a Brainfuck snapshot" % path)
+    try:
+        header_end = content.index(b"\n", len(MAGIC)) + 1
+        header = json.loads(content[len(MAGIC):header_end].decode("utf8"))
+        program_hash, optimizer = header["program"], header["optimizer"]
+    except (ValueError, KeyError, TypeError):  # (a header that is cut, or is not JSON, or misses fields)
+        raise ValueError("'%s' is an invalid snapshot file (its header is missing or corrupt)" % path)
+    if program_hash != get_program_hash(program):
+        raise ValueError("The snapshot '%s' was taken from a different program" % path)
+    if optimizer != OPTIMIZER_VERSION:
+        raise ValueError("The snapshot '%s' was taken by a different version of the interpreter" % path)
+    if header.get("intrinsics", False) != intrinsics:
+        raise ValueError("The snapshot '%s' was taken %s intrinsics" % (path, "with" if header.get("intrinsics") else "without"))
+
+    try:
+        return read_state(content, header_end, header)
+    except zlib.error:
+        raise ValueError("'%s' is an invalid snapshot file (its tape is corrupt)" % path)
+    except (KeyError, TypeError):
+        raise ValueError("'%s' is an invalid snapshot file (its header is missing or corrupt)" % path)
+    except ValueError as e:
+        raise ValueError("'%s' is an invalid snapshot file (%s)" % (path, e))
+
+
+def read_state(content, position, header):
+    # returns the ExecutionState whose parts start at position (after the header) in the content of a snapshot file
+    input_length = header["input"]["length"] if header["input"] is not None else 0
+    if len(content) != position + header["tape_length"] + input_length + header["output_length"]:
+        raise ValueError("its size does not match its header, it may be truncated")
+
+    cells = zlib.decompress(content[position:position + header["tape_length"]])
+    position += header["tape_length"]
+    if len(cells) > header["tape_size"]:
+        raise ValueError("the tape holds more cells than its size")
+
+    tape = Tape(header["tape_size"], header["max_tape"])
+    tape.data[:len(cells)] = cells
+
+    input_source = None
+    if header["input"] is not None:
+        pending_input = content[position:position + input_length]
+        position += input_length
+        if header["input"]["kind"] == "stdin":
+            input_source = StdinInput(header["input"]["eof"])
+            input_source.data = pending_input
+            input_source.reached_eof = header["input"]["reached_eof"]
+        elif header["input"]["kind"] == "feed":
+            input_source = FeedInput(header["input"]["eof"])
+            input_source.feed(pending_input)
+            input_source.closed = header["input"]["closed"]
+        else:
+            input_source = InputSource(pending_input, header["input"]["eof"])
+
+    pending_output = content[position:position + header["output_length"]]
+
+    return ExecutionState(tape, header["instruction_pointer"], header["data_pointer"], header["steps"], input_source, pending_output)
@@ -0,0 +1,218 @@
+import sys
+
+"""
+This file holds the objects that Brainfuck output goes to, and that Brainfuck input comes from
+
+Every output sink has a write(value) method that receives one cell value (int) and a flush() method
+Writing every byte to the terminal on its own (with a flush) costs a system call per byte,
+so output is collected in a buffer and passed on in chunks
+
+Every input source has a read(current) method that receives the value of the current cell and returns its new value
+At the end of the input, the new value depends on the EOF policy:
+    unchanged - the cell keeps its value
+    0         - the cell is set to 0
+    255       - the cell is set to 255 (i.e -1)
+"""
+
+DEFAULT_OUTPUT_BUFFER_SIZE = 8192
+OUTPUT_BUFFER_MODES = ["none", "line", "full"]  # none - flush every byte, line - flush on newline (or when full), full - flush only when full
+
+DEFAULT_INPUT_CHUNK_SIZE = 8192
+EOF_POLICIES = ["unchanged", "0", "255"]
+
+
+class OutputSink:
+    """
+    passes the output to <callback> in chunks (bytes)
+    a chunk is passed when the buffer is full, when a newline is written (if flush_on_newline is True), and on flush()
+    the interpreter flushes before every input read, so a prompt is always shown before waiting for input
+    """
+
+    def __init__(self, callback, buffer_size=DEFAULT_OUTPUT_BUFFER_SIZE, flush_on_newline=True):
+        self.callback = callback
+        self.buffer = bytearray()
+        self.buffer_size = buffer_size
+        self.flush_on_newline = flush_on_newline
+
+    def write(self, value):
+        buffer = self.buffer
+        buffer.append(value)
+        if len(buffer) >= self.buffer_size or (value == 10 and self.flush_on_newline):
+            self.flush()
+
+    def flush(self):
+        if len(self.buffer) > 0:
+            chunk = bytes(self.buffer)
+            self.buffer.clear()
+            self.callback(chunk)
+
+
+class CaptureOutput:
+    """
+    keeps all the output in memory. getvalue() returns it as bytes, and drain() returns it and empties the buffer
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.write = self.buffer.append
+
+    def flush(self):
+        pass
+
+    def getvalue(self):
+        return bytes(self.buffer)
+
+    def drain(self):
+        chunk = bytes(self.buffer)
+        self.buffer.clear()  # (in place, since write is bound to this buffer)
+        return chunk
+
+
+def write_to_stdout(chunk):
+    sys.stdout.flush()  # anything printed before (e.g by print()) should appear before this chunk
+    stream = getattr(sys.stdout, "buffer", None)
+    if stream is None:  # stdout was replaced by a text stream
+        sys.stdout.write(chunk.decode("latin-1"))
+        sys.stdout.flush()
+    else:
+        stream.write(chunk)
+        stream.flush()
+
+
+def get_stdout_sink(mode="line"):
+    """
+    :param mode: one of OUTPUT_BUFFER_MODES
+    :return: a sink that writes to the standard output
+    """
+    if mode == "none":
+        return OutputSink(write_to_stdout, buffer_size=1)
+    elif mode == "line":
+        return OutputSink(write_to_stdout)
+    elif mode == "full":
+        return OutputSink(write_to_stdout, flush_on_newline=False)
+
+    raise ValueError("Unknown output buffer mode '%s' (expected one of: %s)" % (mode, ", ".join(OUTPUT_BUFFER_MODES)))
+
+
+def get_output_sink(output=None, mode="line"):
+    """
+    :param output: None (write to the standard output), a sink, or a callable that receives output chunks (bytes)
+    :param mode: the buffering mode of the standard output sink, one of OUTPUT_BUFFER_MODES
+    """
+    if output is None:
+        return get_stdout_sink(mode)
+    if hasattr(output, "write"):
+        return output
+    return OutputSink(output)  # callback mode
+
+
+class InputSource:
+    """
+    feeds input from a buffer that is given in advance, one byte per read
+    before_read is called before every read (used to flush the output, so a prompt is shown before the input is used)
+    """
+
+    def __init__(self, data=b"", eof="unchanged", before_read=None):
+        if eof not in EOF_POLICIES:
+            raise ValueError("Unknown EOF policy '%s' (expected one of: %s)" % (eof, ", ".join(EOF_POLICIES)))
+
+        self.data = bytes(data)
+        self.position = 0  # index of the next byte to read
+        self.eof = eof
+        self.before_read = before_read
+
+    def read(self, current):
+        if self.before_read is not None:
+            self.before_read()
+
+        position = self.position
+        if position < len(self.data):
+            self.position = position + 1
+            return self.data[position]
+
+        return self.get_eof_value(current)
+
+    def get_eof_value(self, current):
+        if self.eof == "unchanged":
+            return current
+        return int(self.eof)
+
+
+class StdinInput(InputSource):
+    """
+    reads input from the standard input
+    reading is done in chunks of whatever is available (a whole line when typing), and not a system call per byte
+    """
+
+    def __init__(self, eof="unchanged", before_read=None):
+        InputSource.__init__(self, eof=eof, before_read=before_read)
+        self.reached_eof = False
+
+    def read(self, current):
+        if self.before_read is not None:
+            self.before_read()
+
+        position = self.position
+        if position < len(self.data):
+            self.position = position + 1
+            return self.data[position]
+
+        if self.reached_eof or not self.read_chunk():
+            self.reached_eof = True
+            return self.get_eof_value(current)
+
+        self.position = 1
+        return self.data[0]
+
+    def read_chunk(self):
+        # replaces data with the next chunk of the standard input. returns False at the end of the input
+        stream = getattr(sys.stdin, "buffer", None)
+        if stream is None:  # stdin was replaced by a text stream
+            self.data = sys.stdin.read(1).encode("latin-1")
+        else:
+            self.data = stream.read1(DEFAULT_INPUT_CHUNK_SIZE)
+        self.position = 0
+        return len(self.data) > 0
+
+
+class FeedInput(InputSource):
+    """
+    input that arrives while the program runs: feed() adds input, and close() marks the end of the input
+    when there is no input yet, read() returns None, which stops the run before the ',' (status NEEDS_INPUT)
+    so the caller can get more input and continue the run
+    """
+
+    def __init__(self, eof="unchanged", before_read=None):
+        InputSource.__init__(self, eof=eof, before_read=before_read)
+        self.closed = False
+
+    def feed(self, data):
+        self.data = self.data[self.position:] + bytes(data)
+        self.position = 0
+
+    def close(self):
+        self.closed = True
+
+    def read(self, current):
+        if self.before_read is not None:
+            self.before_read()
+
+        position = self.position
+        if position < len(self.data):
+            self.position = position + 1
+            return self.data[position]
+
+        if self.closed:
+            return self.get_eof_value(current)
+        return None
+
+
+def get_input_source(input_bytes=None, eof="unchanged", before_read=None):
+    """
+    :param input_bytes: the whole input (bytes), or None to read from the standard input
+    :param eof: what reading at the end of the input does, one of EOF_POLICIES
+    :param before_read: called before every read
+    """
+    if input_bytes is None:
+        return StdinInput(eof, before_read)
+    return InputSource(input_bytes, eof, before_read)
@@ -0,0 +1,124 @@
+import mmap
+import tempfile
+
+"""
+This file implements the tape (the memory cells) that Brainfuck code runs on
+The cells are held in a contiguous bytearray, which grows when the data pointer moves past its end
+
+A MappedTape holds the cells in a memory mapping instead (of a file, or an anonymous one), which has the same interface
+"""
+
+DEFAULT_TAPE_SIZE = 30000  # the classic Brainfuck tape size
+
+
+class BFRuntimeError(Exception):
+    pass
+
+
+class Tape:
+    def __init__(self, size=DEFAULT_TAPE_SIZE, max_size=None):
+        """
+        :param size: initial amount of cells
+        :param max_size: the tape never grows beyond this amount of cells (None means no limit)
+        """
+        if size <= 0 or (max_size is not None and max_size <= 0):
+            raise ValueError("Tape size must be positive (got %s)" % (size if size <= 0 else max_size))
+        if max_size is not None:
+            size = min(size, max_size)
+
+        self.max_size = max_size
+        self.data = self.create_cells(size)
+
+    def ensure(self, data_pointer):
+        """
+        makes sure that the cell at data_pointer exists, growing the tape if necessary
+        the tape grows geometrically (its size is doubled until it is large enough), so growing is rare
+        returns the buffer that holds the cells
+        """
+        if data_pointer < 0:
+            raise BFRuntimeError("Brainfuck: data pointer moved left of cell 0 (to cell %s)" % data_pointer)
+
+        needed = data_pointer + 1
+        size = len(self.data)
+        if needed <= size:
+            return self.data
+
+        if self.max_size is not None and needed > self.max_size:
+            raise BFRuntimeError("Brainfuck: data pointer moved past the end of the tape (to cell %s, the tape is limited to %s cells)" % (data_pointer, self.max_size))
+
+        new_size = size
+        while new_size < needed:
+            new_size *= 2
+        if self.max_size is not None:
+            new_size = min(new_size, self.max_size)
+
+        try:
+            self.grow(new_size)
+        except BufferError:  # a memoryview of the cells is held (see Interpreter.tape)
+            raise BFRuntimeError("Brainfuck: the tape cannot grow (to %s cells) while a view of its cells is held" % new_size)
+        return self.data
+
+    def create_cells(self, size):
+        return bytearray(size)
+
+    def grow(self, new_size):
+        self.data.extend(bytes(new_size - len(self.data)))
+
+
+class MappedTape(Tape):
+    """
+    a tape whose cells are held in a memory mapping
+    the OS pages in only the cells that the program touches, so very large tapes are cheap
+    when a file is given, the cells are kept in it: other processes can inspect them during the run,
+    and they stay there after the run ends (or crashes)
+    """
+
+    def __init__(self, size=DEFAULT_TAPE_SIZE, max_size=None, path=None):
+        """
+        :param path: the file that holds the cells (it is created, or overwritten), None for an anonymous mapping
+        (which is held in a temporary file that has no name: an anonymous shared mapping cannot grow, its new pages raise SIGBUS)
+        """
+        self.path = path
+        self.file = None
+        Tape.__init__(self, size, max_size)
+
+    def create_cells(self, size):
+        self.file = open(self.path, "w+b") if self.path is not None else tempfile.TemporaryFile()
+        self.file.truncate(size)  # a sparse file of zeros
+        return mmap.mmap(self.file.fileno(), size)
+
+    def grow(self, new_size):
+        self.file.truncate(new_size)
+        self.data.resize(new_size)  # the mapping object stays the same, so references to it remain valid
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+
+def scan(data, data_pointer, stride):
+    """
+    returns the first cell that is 0, starting at data_pointer and moving <stride> cells at a time
+    (this is what [>], [<], [>>] etc. do)
+    the returned cell may be past the end of data (all the cells there are 0), or left of cell 0 (which is an error)
+    """
+    if stride > 0:
+        while True:
+            zero = data.find(b"\0", data_pointer)  # (a bytes argument works with memory mappings too)
+            if zero == -1:  # there are no zeros left. continue with the same stride into the (zero) cells after the end
+                return data_pointer + -(-(len(data) - data_pointer) // stride) * stride
+            if (zero - data_pointer) % stride == 0:
+                return zero
+            data_pointer += -(-(zero - data_pointer) // stride) * stride  # the first cell we land on after <zero>
+
+    else:
+        stride = -stride
+        while True:
+            zero = data.rfind(b"\0", 0, data_pointer + 1)
+            if zero == -1:
+                return data_pointer - (data_pointer // stride + 1) * stride  # moves left of cell 0
+            if (data_pointer - zero) % stride == 0:
+                return zero
+            data_pointer -= -(-(data_pointer - zero) // stride) * stride
+            if data_pointer < 0:
+                return data_pointer